@@ -12,6 +12,9 @@ PROMPTS_DIR = BASE_DIR / "prompts"
 # 数据库配置
 DATABASE_PATH = DATA_DIR / "qualitative_research.db"
 
+# LLM结果持久化缓存目录
+LLM_CACHE_DIR = DATA_DIR / "cache" / "llm"
+
 # LLM提供商配置（简化版）
 SUPPORTED_LLM_PROVIDERS = {
     "lm_studio": {
@@ -535,6 +535,44 @@ class Database:
         """, (theme_id,))
         return [dict(row) for row in cursor.fetchall()]
 
+    def get_all_theme_codes(self, project_id: str) -> Dict[str, List[Dict]]:
+        """获取项目所有主题关联的编码，按主题ID分组"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT c.*, tc.theme_id, tc.relevance_score
+            FROM codes c
+            JOIN theme_codes tc ON c.id = tc.code_id
+            JOIN themes t ON tc.theme_id = t.id
+            WHERE t.project_id = ?
+            ORDER BY tc.relevance_score DESC, c.name
+        """, (project_id,))
+        theme_codes: Dict[str, List[Dict]] = {}
+        for row in cursor.fetchall():
+            code = dict(row)
+            theme_codes.setdefault(code.pop('theme_id'), []).append(code)
+        return theme_codes
+
+    def get_all_theme_codes_with_stats(self, project_id: str) -> Dict[str, List[Dict]]:
+        """获取项目所有主题关联的编码及统计信息，按主题ID分组"""
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT c.*, tc.theme_id, tc.relevance_score,
+                   COUNT(DISTINCT co.id) as coding_count,
+                   COUNT(DISTINCT co.document_id) as document_count
+            FROM codes c
+            JOIN theme_codes tc ON c.id = tc.code_id
+            JOIN themes t ON tc.theme_id = t.id
+            LEFT JOIN codings co ON c.id = co.code_id
+            WHERE t.project_id = ?
+            GROUP BY tc.theme_id, c.id, tc.relevance_score
+            ORDER BY tc.relevance_score DESC, c.name
+        """, (project_id,))
+        theme_codes: Dict[str, List[Dict]] = {}
+        for row in cursor.fetchall():
+            code = dict(row)
+            theme_codes.setdefault(code.pop('theme_id'), []).append(code)
+        return theme_codes
+
     def get_theme_code_associations(self, project_id: str) -> List[Dict]:
         """获取项目的所有主题-编码关联"""
         cursor = self.conn.cursor()
@@ -630,6 +668,15 @@ class Database:
             'theme_count': theme_count,
         }
 
+    def get_data_version(self) -> int:
+        """
+        获取数据版本号
+
+        返回当前连接累计修改的行数，任何写入都会使其增加，
+        可作为缓存失效的令牌
+        """
+        return self.conn.total_changes
+
     # ==================== 报告操作 ====================
 
     def create_report(self, project_id: str, title: str, report_type: str = 'paper',
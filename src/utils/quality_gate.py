@@ -4,11 +4,14 @@
 实现编码质量的多维度检查和报告
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 
+from src.coding import get_coding_manager
+from src.document import get_document_manager
+
 
 class QualityStatus(Enum):
     """质量状态"""
@@ -152,8 +155,6 @@ class CodingConsistencyCheck(QualityGate):
         Returns:
             质量检查结果
         """
-        from src.coding import get_coding_manager
-
         coding_manager = kwargs.get("coding_manager") or get_coding_manager()
 
         # 获取所有编码
@@ -205,14 +206,12 @@ class CodingCoverageCheck(QualityGate):
 
         Args:
             project_id: 项目ID
-            **kwargs: document_manager, coding_manager (必需)
+            **kwargs: document_manager, coding_manager (必需)；
+                verbose 为True时通过检查也返回逐文档明细
 
         Returns:
             质量检查结果
         """
-        from src.document import get_document_manager
-        from src.coding import get_coding_manager
-
         document_manager = kwargs.get("document_manager") or get_document_manager()
         coding_manager = kwargs.get("coding_manager") or get_coding_manager()
 
@@ -222,21 +221,19 @@ class CodingCoverageCheck(QualityGate):
         if not documents:
             return self._warn("项目没有文档，跳过覆盖率检查")
 
-        # 计算每个文档的编码覆盖率
-        coverage_data = []
+        # 计算每个文档的编码字符数，仅保留聚合所需的最小信息
+        doc_stats = []
         total_chars = 0
         coded_chars = 0
 
         for doc in documents:
-            doc_id = doc["id"]
-            content = doc.get("content", "")
-            doc_length = len(content)
+            doc_length = len(doc.get("content", ""))
 
             if doc_length == 0:
                 continue
 
             # 获取该文档的所有编码
-            codings = coding_manager.get_document_codings(doc_id)
+            codings = coding_manager.get_document_codings(doc["id"])
 
             # 计算编码覆盖的字符数
             coded_length = sum(
@@ -244,40 +241,34 @@ class CodingCoverageCheck(QualityGate):
                 for c in codings
             )
 
-            coverage_rate = coded_length / doc_length if doc_length > 0 else 0
-
-            coverage_data.append({
-                "document_id": doc_id,
-                "filename": doc["filename"],
-                "total_chars": doc_length,
-                "coded_chars": coded_length,
-                "coverage_rate": coverage_rate
-            })
-
+            doc_stats.append((doc, doc_length, coded_length))
             total_chars += doc_length
             coded_chars += coded_length
 
         # 计算总体覆盖率
         overall_coverage = coded_chars / total_chars if total_chars > 0 else 0
 
+        details = {
+            "overall_coverage": overall_coverage,
+            "total_documents": len(documents)
+        }
+
         # 判断质量状态
         if overall_coverage >= 0.5:
+            if kwargs.get("verbose", False):
+                details["coverage_data"] = self._build_coverage_data(doc_stats)
             return self._pass(
                 f"编码覆盖率良好: {overall_coverage:.1%}",
-                details={
-                    "overall_coverage": overall_coverage,
-                    "total_documents": len(documents),
-                    "coverage_data": coverage_data
-                }
+                details=details
             )
-        elif overall_coverage >= 0.3:
+
+        # 警告和失败时才需要逐文档明细
+        details["coverage_data"] = self._build_coverage_data(doc_stats)
+
+        if overall_coverage >= 0.3:
             return self._warn(
                 f"编码覆盖率较低: {overall_coverage:.1%}，建议继续编码",
-                details={
-                    "overall_coverage": overall_coverage,
-                    "total_documents": len(documents),
-                    "coverage_data": coverage_data
-                },
+                details=details,
                 suggestions=[
                     "继续对文档进行编码",
                     "使用AI辅助编码功能提高效率",
@@ -287,11 +278,7 @@ class CodingCoverageCheck(QualityGate):
         else:
             return self._fail(
                 f"编码覆盖率过低: {overall_coverage:.1%}，需要大量编码工作",
-                details={
-                    "overall_coverage": overall_coverage,
-                    "total_documents": len(documents),
-                    "coverage_data": coverage_data
-                },
+                details=details,
                 suggestions=[
                     "开始系统性的编码工作",
                     "考虑使用AI辅助编码",
@@ -299,6 +286,20 @@ class CodingCoverageCheck(QualityGate):
                 ]
             )
 
+    @staticmethod
+    def _build_coverage_data(doc_stats: List[Tuple[Dict[str, Any], int, int]]) -> List[Dict[str, Any]]:
+        """根据聚合阶段收集的统计生成逐文档覆盖率明细"""
+        return [
+            {
+                "document_id": doc["id"],
+                "filename": doc["filename"],
+                "total_chars": doc_length,
+                "coded_chars": coded_length,
+                "coverage_rate": coded_length / doc_length
+            }
+            for doc, doc_length, coded_length in doc_stats
+        ]
+
 
 class RedundantCodeCheck(QualityGate):
     """冗余编码检查"""
@@ -320,8 +321,6 @@ class RedundantCodeCheck(QualityGate):
         Returns:
             质量检查结果
         """
-        from src.coding import get_coding_manager
-
         coding_manager = kwargs.get("coding_manager") or get_coding_manager()
 
         # 获取所有编码
@@ -383,8 +382,6 @@ class UnusedCodeCheck(QualityGate):
         Returns:
             质量检查结果
         """
-        from src.coding import get_coding_manager
-
         coding_manager = kwargs.get("coding_manager") or get_coding_manager()
 
         # 获取编码统计
@@ -522,11 +519,8 @@ class QualityInspector:
                         message=f"检查执行失败: {str(e)}"
                     ))
 
-        # 确定总体状态
-        overall_status = self._determine_overall_status(results)
-
-        # 生成摘要
-        summary = self._generate_summary(results)
+        # 单次遍历确定总体状态并生成摘要
+        overall_status, summary = self._summarize(results)
 
         return QualityReport(
             project_id=project_id,
@@ -536,25 +530,42 @@ class QualityInspector:
             summary=summary
         )
 
-    def _determine_overall_status(self, results: List[QualityCheckResult]) -> QualityStatus:
-        """确定总体质量状态"""
-        if any(r.status == QualityStatus.FAILED for r in results):
-            return QualityStatus.FAILED
-        elif any(r.status == QualityStatus.WARNING for r in results):
-            return QualityStatus.WARNING
-        elif all(r.status == QualityStatus.PASSED for r in results):
-            return QualityStatus.PASSED
-        else:
-            return QualityStatus.SKIPPED
+    def _summarize(self, results: List[QualityCheckResult]) -> Tuple[QualityStatus, Dict[str, Any]]:
+        """
+        单次遍历检查结果，同时确定总体质量状态并生成摘要
 
-    def _generate_summary(self, results: List[QualityCheckResult]) -> Dict[str, Any]:
-        """生成质量摘要"""
-        total = len(results)
-        passed = sum(1 for r in results if r.status == QualityStatus.PASSED)
-        warnings = sum(1 for r in results if r.status == QualityStatus.WARNING)
-        failed = sum(1 for r in results if r.status == QualityStatus.FAILED)
+        Args:
+            results: 检查结果列表
+
+        Returns:
+            (总体质量状态, 质量摘要)
+        """
+        total = 0
+        passed = 0
+        warnings = 0
+        failed = 0
+
+        for r in results:
+            total += 1
+            status = r.status
+            if status is QualityStatus.PASSED:
+                passed += 1
+            elif status is QualityStatus.WARNING:
+                warnings += 1
+            elif status is QualityStatus.FAILED:
+                failed += 1
 
-        return {
+        # 确定总体状态
+        if failed:
+            overall_status = QualityStatus.FAILED
+        elif warnings:
+            overall_status = QualityStatus.WARNING
+        elif passed == total:
+            overall_status = QualityStatus.PASSED
+        else:
+            overall_status = QualityStatus.SKIPPED
+
+        summary = {
             "total_checks": total,
             "passed_checks": passed,
             "warning_checks": warnings,
@@ -562,6 +573,8 @@ class QualityInspector:
             "quality_score": round((passed + 0.5 * warnings) / total, 2) if total > 0 else 0.0
         }
 
+        return overall_status, summary
+
 
 def get_quality_inspector() -> QualityInspector:
     """
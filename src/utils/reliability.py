@@ -145,39 +145,35 @@ def calculate_krippendorffs_alpha(codings: List[List[str]],
         if len(coding) != n_items:
             raise ValueError("所有编码者的编码数量必须相同")
     
-    # 获取所有唯一值
-    all_values = set()
-    for coding in codings:
-        all_values.update([c for c in coding if c != missing_value])
-    all_values = sorted(all_values)
-    
-    # 创建值到索引的映射
-    value_to_idx = {v: i for i, v in enumerate(all_values)}
+    # 一次遍历得到排序后的唯一值及每个单元格对应的值索引（缺失值记为-1）
+    arr = np.asarray(codings, dtype=object)
+    mask = arr != missing_value
+    all_values, inverse = np.unique(arr[mask], return_inverse=True)
     n_values = len(all_values)
-    
+
+    codings_idx = np.full((n_coders, n_items), -1, dtype=np.int64)
+    codings_idx[mask] = inverse.ravel()
+
     # 计算coincidence matrix
     coincidence = np.zeros((n_values, n_values))
-    
+
     for item_idx in range(n_items):
         # 获取该项目的所有非缺失编码
-        item_codings = [codings[coder][item_idx] for coder in range(n_coders)
-                       if codings[coder][item_idx] != missing_value]
-        
+        column = codings_idx[:, item_idx]
+        item_codings = column[column >= 0].tolist()
+
         m = len(item_codings)  # 该项目的编码者数量
-        
+
         if m < 2:
             continue
-        
+
         # 更新coincidence matrix
-        for i, c1 in enumerate(item_codings):
-            for c2 in item_codings[i:]:
-                idx1 = value_to_idx[c1]
-                idx2 = value_to_idx[c2]
-                
-                if c1 == c2:
-                    coincidence[idx1, idx2] += 1 / (m - 1)
+        weight = 1 / (m - 1)
+        for i, idx1 in enumerate(item_codings):
+            for idx2 in item_codings[i:]:
+                if idx1 == idx2:
+                    coincidence[idx1, idx2] += weight
                 else:
-                    weight = 1 / (m - 1)
                     coincidence[idx1, idx2] += weight / 2
                     coincidence[idx2, idx1] += weight / 2
     
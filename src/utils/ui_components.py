@@ -2,13 +2,18 @@
 UI组件库 - 统一的视觉设计系统
 提供现代化的UI组件和样式
 """
+import hashlib
+from functools import lru_cache
+from types import MappingProxyType
+
 import streamlit as st
 
 
 # ==================== CSS样式系统 ====================
-def inject_custom_css():
-    """注入自定义CSS样式"""
-    st.markdown("""
+@st.cache_resource
+def _css_html():
+    """构建自定义CSS样式块（进程内只构建一次）"""
+    return """
     <style>
     /* ========== 配色系统 ========== */
     :root {
@@ -186,13 +191,21 @@ def inject_custom_css():
         animation: fadeIn 0.5s ease-out;
     }
     </style>
-    """, unsafe_allow_html=True)
+    """
 
 
-# ==================== 卡片组件 ====================
-def render_card(title, content, icon="📊", border_color="#2E86DE", bg_color="#FFFFFF"):
-    """渲染卡片组件"""
-    st.markdown(f"""
+def inject_custom_css():
+    """
+    注入自定义CSS样式
+
+    Streamlit 每次重新运行都会清除未重新输出的元素，因此样式块仍需每次输出，
+    这里只复用缓存的HTML字符串
+    """
+    st.markdown(_css_html(), unsafe_allow_html=True)
+
+
+# ==================== HTML模板 ====================
+_CARD_TPL = """
     <div style="
         border-left: 4px solid {border_color};
         padding: 1.5rem;
@@ -210,18 +223,9 @@ def render_card(title, content, icon="📊", border_color="#2E86DE", bg_color="#
             {content}
         </div>
     </div>
-    """, unsafe_allow_html=True)
-
+    """
 
-def render_stat_card(label, value, icon="📊", color="#2E86DE", delta=None):
-    """渲染统计卡片"""
-    delta_html = ""
-    if delta:
-        delta_color = "#26C281" if delta > 0 else "#E74C3C"
-        delta_icon = "↑" if delta > 0 else "↓"
-        delta_html = f'<div style="color: {delta_color}; font-size: 0.9rem; margin-top: 0.5rem;">{delta_icon} {abs(delta)}%</div>'
-    
-    st.markdown(f"""
+_STAT_CARD_TPL = """
     <div style="
         padding: 1.5rem;
         border-radius: 12px;
@@ -235,12 +239,11 @@ def render_stat_card(label, value, icon="📊", color="#2E86DE", delta=None):
         <div style="font-size: 0.9rem; color: #495057; text-transform: uppercase; letter-spacing: 0.5px;">{label}</div>
         {delta_html}
     </div>
-    """, unsafe_allow_html=True)
+    """
 
+_DELTA_TPL = '<div style="color: {delta_color}; font-size: 0.9rem; margin-top: 0.5rem;">{delta_icon} {delta}%</div>'
 
-def render_highlight_card(title, content, icon="✨", gradient="linear-gradient(135deg, #2E86DE 0%, #5FA3E8 100%)"):
-    """渲染高亮卡片（带渐变背景）"""
-    st.markdown(f"""
+_HIGHLIGHT_CARD_TPL = """
     <div style="
         padding: 2rem;
         border-radius: 16px;
@@ -257,34 +260,128 @@ def render_highlight_card(title, content, icon="✨", gradient="linear-gradient(
             {content}
         </div>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+_SMART_TIP_TPL = """
+    <div style="
+        padding: 1rem 1.5rem;
+        border-radius: 10px;
+        background: {color}10;
+        border-left: 4px solid {color};
+        margin: 1rem 0;
+        display: flex;
+        align-items: center;
+        gap: 1rem;
+    ">
+        <div style="font-size: 1.5rem;">{icon}</div>
+        <div style="flex: 1; color: #495057;">{message}</div>
+    </div>
+    """
+
+_LOADING_TPL = """
+    <div style="
+        padding: 2rem;
+        border-radius: 12px;
+        background: linear-gradient(135deg, #F8F9FA 0%, #FFFFFF 100%);
+        text-align: center;
+        box-shadow: 0 4px 12px rgba(0,0,0,0.05);
+        margin: 2rem 0;
+    ">
+        <div style="font-size: 3rem; margin-bottom: 1rem; animation: pulse 2s infinite;">🤖</div>
+        <h3 style="color: #2E86DE; margin-bottom: 0.5rem;">{message}</h3>
+        {progress_html}
+        {tip_html}
+    </div>
+    """
+
+_LOADING_PROGRESS_TPL = "<div style='color: #26C281; font-weight: 600; margin-top: 1rem;'>进度: {progress}%</div>"
+
+_LOADING_TIP_TPL = "<div style='color: #495057; font-size: 0.9rem; margin-top: 1rem; font-style: italic;'>💡 {tip}</div>"
+
+_EMPTY_STATE_TPL = """
+    <div style="
+        padding: 3rem 2rem;
+        text-align: center;
+        background: #F8F9FA;
+        border-radius: 12px;
+        margin: 2rem 0;
+    ">
+        <div style="font-size: 4rem; margin-bottom: 1rem; opacity: 0.5;">{icon}</div>
+        <h3 style="color: #495057; margin-bottom: 0.5rem;">{title}</h3>
+        <p style="color: #6c757d; margin-bottom: 2rem;">{message}</p>
+    </div>
+    """
+
+
+# ==================== 卡片组件 ====================
+@lru_cache(maxsize=256)
+def _card_html(title, content, icon, border_color, bg_color):
+    """生成卡片HTML"""
+    return _CARD_TPL.format(title=title, content=content, icon=icon,
+                            border_color=border_color, bg_color=bg_color)
+
+
+def render_card(title, content, icon="📊", border_color="#2E86DE", bg_color="#FFFFFF"):
+    """渲染卡片组件"""
+    st.markdown(_card_html(title, content, icon, border_color, bg_color), unsafe_allow_html=True)
+
+
+@lru_cache(maxsize=64)
+def _delta_html(delta):
+    """生成变化量HTML"""
+    if delta > 0:
+        return _DELTA_TPL.format(delta_color="#26C281", delta_icon="↑", delta=delta)
+    return _DELTA_TPL.format(delta_color="#E74C3C", delta_icon="↓", delta=abs(delta))
+
+
+@lru_cache(maxsize=256)
+def _stat_card_html(label, value, icon, color, delta):
+    """生成统计卡片HTML"""
+    # delta 为 None 或 0 时不显示变化量
+    delta_html = _delta_html(delta) if delta else ""
+
+    return _STAT_CARD_TPL.format(label=label, value=value, icon=icon, color=color,
+                                 delta_html=delta_html)
+
+
+def render_stat_card(label, value, icon="📊", color="#2E86DE", delta=None):
+    """渲染统计卡片"""
+    st.markdown(_stat_card_html(label, value, icon, color, delta), unsafe_allow_html=True)
+
+
+def render_highlight_card(title, content, icon="✨", gradient="linear-gradient(135deg, #2E86DE 0%, #5FA3E8 100%)"):
+    """渲染高亮卡片（带渐变背景）"""
+    st.markdown(_HIGHLIGHT_CARD_TPL.format(title=title, content=content, icon=icon, gradient=gradient),
+                unsafe_allow_html=True)
 
 
 # ==================== 进度指示器 ====================
-def render_workflow_progress(current_step, total_steps=3):
-    """渲染工作流程进度条"""
-    steps = ["📋 数据准备", "🔍 编码分析", "📊 可视报告"]
-    
-    progress_html = '<div style="display: flex; justify-content: space-between; align-items: center; margin: 2rem 0;">'
-    
-    for i, step in enumerate(steps[:total_steps], 1):
-        is_current = i == current_step
+_WORKFLOW_STEPS = ("📋 数据准备", "🔍 编码分析", "📊 可视报告")
+
+# 步骤状态 -> (颜色, 状态符号, 透明度)
+_STEP_STYLES = {
+    "completed": ("#26C281", "✓", "1"),
+    "current": ("#2E86DE", "●", "1"),
+    "pending": ("#DEE2E6", "○", "0.5"),
+}
+
+
+@lru_cache(maxsize=32)
+def _progress_html(current_step, total_steps):
+    """生成工作流程进度条HTML（纯函数，结果可缓存）"""
+    parts = ['<div style="display: flex; justify-content: space-between; align-items: center; margin: 2rem 0;">']
+
+    for i, step in enumerate(_WORKFLOW_STEPS[:total_steps], 1):
         is_completed = i < current_step
-        
+
         if is_completed:
-            color = "#26C281"
-            status = "✓"
-            opacity = "1"
-        elif is_current:
-            color = "#2E86DE"
-            status = "●"
-            opacity = "1"
+            color, status, opacity = _STEP_STYLES["completed"]
+        elif i == current_step:
+            color, status, opacity = _STEP_STYLES["current"]
         else:
-            color = "#DEE2E6"
-            status = "○"
-            opacity = "0.5"
-        
-        progress_html += f"""
+            color, status, opacity = _STEP_STYLES["pending"]
+
+        parts.append(f"""
         <div style="flex: 1; text-align: center; opacity: {opacity};">
             <div style="
                 width: 60px;
@@ -302,28 +399,34 @@ def render_workflow_progress(current_step, total_steps=3):
             ">{status}</div>
             <div style="font-size: 0.9rem; font-weight: 600; color: {color};">{step}</div>
         </div>
-        """
-        
+        """)
+
         if i < total_steps:
             line_color = "#26C281" if is_completed else "#DEE2E6"
-            progress_html += f'<div style="flex: 0.5; height: 3px; background: {line_color}; margin-bottom: 2rem;"></div>'
-    
-    progress_html += '</div>'
-    st.markdown(progress_html, unsafe_allow_html=True)
+            parts.append(f'<div style="flex: 0.5; height: 3px; background: {line_color}; margin-bottom: 2rem;"></div>')
+
+    parts.append('</div>')
+    return "".join(parts)
+
+
+def render_workflow_progress(current_step, total_steps=3):
+    """渲染工作流程进度条"""
+    st.markdown(_progress_html(current_step, total_steps), unsafe_allow_html=True)
 
 
 # ==================== 徽章组件 ====================
+_BADGE_STYLES = MappingProxyType({
+    "success": ("#26C281", "✓"),
+    "warning": ("#F39C12", "⚠"),
+    "danger": ("#E74C3C", "✕"),
+    "info": ("#3498DB", "ℹ"),
+    "primary": ("#2E86DE", "●")
+})
+
+
 def render_badge(text, type="info"):
     """渲染状态徽章"""
-    colors = {
-        "success": ("#26C281", "✓"),
-        "warning": ("#F39C12", "⚠"),
-        "danger": ("#E74C3C", "✕"),
-        "info": ("#3498DB", "ℹ"),
-        "primary": ("#2E86DE", "●")
-    }
-    
-    color, icon = colors.get(type, colors["info"])
+    color, icon = _BADGE_STYLES.get(type, _BADGE_STYLES["info"])
     
     return f"""
     <span style="
@@ -340,84 +443,54 @@ def render_badge(text, type="info"):
 
 
 # ==================== 智能提示组件 ====================
-def render_smart_tip(message, type="info", action_text=None, action_callback=None):
+_TIP_ICONS = MappingProxyType({
+    "success": "✅",
+    "info": "💡",
+    "warning": "⚠️",
+    "error": "❌",
+    "tip": "💡"
+})
+
+_TIP_COLORS = MappingProxyType({
+    "success": "#26C281",
+    "info": "#3498DB",
+    "warning": "#F39C12",
+    "error": "#E74C3C",
+    "tip": "#2E86DE"
+})
+
+
+@lru_cache(maxsize=256)
+def _stable_key(text):
+    """为文本生成跨进程稳定的短键（内置hash对字符串是随机化的）"""
+    return hashlib.blake2s(text.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def render_smart_tip(message, type="info", action_text=None, action_callback=None, key=None):
     """渲染智能提示"""
-    icons = {
-        "success": "✅",
-        "info": "💡",
-        "warning": "⚠️",
-        "error": "❌",
-        "tip": "💡"
-    }
+    icon = _TIP_ICONS.get(type, "💡")
+    color = _TIP_COLORS.get(type, "#3498DB")
     
-    colors = {
-        "success": "#26C281",
-        "info": "#3498DB",
-        "warning": "#F39C12",
-        "error": "#E74C3C",
-        "tip": "#2E86DE"
-    }
-    
-    icon = icons.get(type, "💡")
-    color = colors.get(type, "#3498DB")
-    
-    st.markdown(f"""
-    <div style="
-        padding: 1rem 1.5rem;
-        border-radius: 10px;
-        background: {color}10;
-        border-left: 4px solid {color};
-        margin: 1rem 0;
-        display: flex;
-        align-items: center;
-        gap: 1rem;
-    ">
-        <div style="font-size: 1.5rem;">{icon}</div>
-        <div style="flex: 1; color: #495057;">{message}</div>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_SMART_TIP_TPL.format(color=color, icon=icon, message=message), unsafe_allow_html=True)
     
     if action_text and action_callback:
-        if st.button(action_text, key=f"tip_action_{hash(message)}"):
+        if st.button(action_text, key=f"tip_action_{key or _stable_key(message)}"):
             action_callback()
 
 
 # ==================== 加载动画 ====================
 def render_loading_message(message, progress=None, tip=None):
     """渲染增强的加载消息"""
-    st.markdown(f"""
-    <div style="
-        padding: 2rem;
-        border-radius: 12px;
-        background: linear-gradient(135deg, #F8F9FA 0%, #FFFFFF 100%);
-        text-align: center;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.05);
-        margin: 2rem 0;
-    ">
-        <div style="font-size: 3rem; margin-bottom: 1rem; animation: pulse 2s infinite;">🤖</div>
-        <h3 style="color: #2E86DE; margin-bottom: 0.5rem;">{message}</h3>
-        {"<div style='color: #26C281; font-weight: 600; margin-top: 1rem;'>进度: " + str(progress) + "%</div>" if progress else ""}
-        {"<div style='color: #495057; font-size: 0.9rem; margin-top: 1rem; font-style: italic;'>💡 " + tip + "</div>" if tip else ""}
-    </div>
-    """, unsafe_allow_html=True)
+    progress_html = _LOADING_PROGRESS_TPL.format(progress=progress) if progress else ""
+    tip_html = _LOADING_TIP_TPL.format(tip=tip) if tip else ""
+    st.markdown(_LOADING_TPL.format(message=message, progress_html=progress_html, tip_html=tip_html),
+                unsafe_allow_html=True)
 
 
 # ==================== 空状态组件 ====================
 def render_empty_state(title, message, icon="📭", action_text=None, action_callback=None):
     """渲染空状态"""
-    st.markdown(f"""
-    <div style="
-        padding: 3rem 2rem;
-        text-align: center;
-        background: #F8F9FA;
-        border-radius: 12px;
-        margin: 2rem 0;
-    ">
-        <div style="font-size: 4rem; margin-bottom: 1rem; opacity: 0.5;">{icon}</div>
-        <h3 style="color: #495057; margin-bottom: 0.5rem;">{title}</h3>
-        <p style="color: #6c757d; margin-bottom: 2rem;">{message}</p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(_EMPTY_STATE_TPL.format(title=title, message=message, icon=icon), unsafe_allow_html=True)
     
     if action_text and action_callback:
         col1, col2, col3 = st.columns([1, 1, 1])
@@ -3,9 +3,25 @@ AI辅助质性研究平台 - 可视化模块
 使用Plotly创建交互式图表
 """
 from typing import List, Dict, Optional, Any
+from collections import Counter, OrderedDict
+import hashlib
+import heapq
+import json
+import streamlit as st
 import plotly.graph_objects as go
 import plotly.express as px
+from plotly.subplots import make_subplots
 import pandas as pd
+import numpy as np
+import networkx as nx
+
+from src.utils.database import get_db
+
+# 节点数与边数之和超过该值时改用 Scattergl（WebGL）渲染网络图
+WEBGL_THRESHOLD = 100
+
+# 会话中缓存的布局结果数量上限
+LAYOUT_CACHE_SIZE = 64
 
 
 class ThemeNetworkGraph:
@@ -29,58 +45,60 @@ class ThemeNetworkGraph:
         """
         创建网络图
 
+        相同输入的图形按内容哈希缓存，避免重复计算布局
+
         Args:
             layout_type: 布局类型 ("spring", "circular", "hierarchical")
 
         Returns:
             Plotly Figure对象
         """
-        # 构建节点
-        nodes = []
-        node_colors = []
-        node_sizes = []
-        node_texts = []
-        node_labels = []  # 用于悬停显示的完整信息
-
-        # 添加主题节点
+        return go.Figure(_build_network_figure(self._content_key(), layout_type, self))
+
+    def _content_key(self) -> str:
+        """计算主题、编码和关联数据的内容哈希"""
+        payload = json.dumps(
+            [self.themes, self.codes, self.associations],
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _build_figure(self, layout_type: str) -> go.Figure:
+        """构建网络图（未缓存）"""
+        # 构建节点：每个节点一行 (id, 名称, 类型, 大小, 颜色, 悬停信息)
+        rows = []
         for theme in self.themes:
             theme_name = theme.get('name', '未知主题')
             code_count = len(theme.get('codes', []))
+            rows.append((
+                theme['id'],
+                theme_name,
+                'theme',
+                30 + min(code_count * 3, 30),  # 根据关联编码数调整大小
+                '#3498db',  # 蓝色
+                f"主题: {theme_name}<br>关联编码: {code_count}个"
+            ))
 
-            nodes.append({
-                'id': theme['id'],
-                'label': theme_name,
-                'type': 'theme',
-                'size': 30 + min(code_count * 3, 30),  # 根据关联编码数调整大小
-                'color': '#3498db'  # 蓝色
-            })
-            node_colors.append('#3498db')
-            node_sizes.append(30 + min(code_count * 3, 30))
-            node_texts.append(theme_name)
-            node_labels.append(f"主题: {theme_name}<br>关联编码: {code_count}个")
-
-        # 添加编码节点
         for code in self.codes:
             code_name = code.get('name', '未知编码')
             usage_count = code.get('usage_count', 0)
-            color = code.get('color', '#95a5a6')
-
-            nodes.append({
-                'id': code['id'],
-                'label': code_name,
-                'type': 'code',
-                'size': 15 + min(usage_count, 15),  # 根据使用次数调整大小
-                'color': color
-            })
-            node_colors.append(color)
-            node_sizes.append(15 + min(usage_count, 15))
-            node_texts.append(code_name)
-            node_labels.append(f"编码: {code_name}<br>使用次数: {usage_count}")
-
-        # 构建边
+            rows.append((
+                code['id'],
+                code_name,
+                'code',
+                15 + min(usage_count, 15),  # 根据使用次数调整大小
+                code.get('color', '#95a5a6'),
+                f"编码: {code_name}<br>使用次数: {usage_count}"
+            ))
+
+        node_ids, node_texts, node_types, node_sizes, node_colors, node_labels = (
+            map(list, zip(*rows)) if rows else ([], [], [], [], [], [])
+        )
+        nodes = [{'id': node_id, 'type': node_type} for node_id, node_type in zip(node_ids, node_types)]
+
+        # 构建边，按关联强度分档（0, 0.25, ..., 1）以便每档合并为一条轨迹
         edges = []
-        edge_colors = []
-        edge_widths = []
+        edge_buckets = []
 
         for assoc in self.associations:
             theme_id = assoc.get('theme_id')
@@ -88,39 +106,50 @@ class ThemeNetworkGraph:
             relevance = assoc.get('relevance_score', 1.0)
 
             edges.append((theme_id, code_id))
-            edge_colors.append(f'rgba(52, 152, 219, {0.3 + relevance * 0.5})')
-            edge_widths.append(1 + relevance * 4)
+            edge_buckets.append(round(relevance * 4) / 4)
 
         # 计算节点位置（使用简单的力导向布局）
         node_positions = self._calculate_layout(nodes, edges, layout_type)
 
-        # 提取x和y坐标
-        x_coords = [node_positions[n['id']]['x'] for n in nodes]
-        y_coords = [node_positions[n['id']]['y'] for n in nodes]
-
-        # 创建边
-        edge_traces = []
-        for i, (source, target) in enumerate(edges):
-            x0 = node_positions[source]['x']
-            y0 = node_positions[source]['y']
-            x1 = node_positions[target]['x']
-            y1 = node_positions[target]['y']
-
-            edge_trace = go.Scatter(
-                x=[x0, x1, None],
-                y=[y0, y1, None],
+        # 提取x和y坐标，以NumPy数组传给Plotly，序列化时可走二进制编码快速路径
+        n_nodes = len(node_ids)
+        x_coords = np.fromiter((node_positions[node_id]['x'] for node_id in node_ids),
+                               dtype=np.float32, count=n_nodes)
+        y_coords = np.fromiter((node_positions[node_id]['y'] for node_id in node_ids),
+                               dtype=np.float32, count=n_nodes)
+        node_sizes = np.fromiter(node_sizes, dtype=np.int16, count=n_nodes)
+
+        # 元素较多时使用WebGL渲染
+        scatter_cls = go.Scattergl if len(nodes) + len(edges) > WEBGL_THRESHOLD else go.Scatter
+
+        # 创建边：同一强度档的边合并到一条轨迹，用None分隔各段
+        bucket_coords: Dict[float, tuple] = {}
+        for (source, target), bucket in zip(edges, edge_buckets):
+            source_pos = node_positions.get(source)
+            target_pos = node_positions.get(target)
+            if source_pos is None or target_pos is None:
+                continue
+            edge_x, edge_y = bucket_coords.setdefault(bucket, ([], []))
+            edge_x += [source_pos['x'], target_pos['x'], None]
+            edge_y += [source_pos['y'], target_pos['y'], None]
+
+        edge_traces = [
+            scatter_cls(
+                x=edge_x,
+                y=edge_y,
                 mode='lines',
                 line=dict(
-                    color=edge_colors[i],
-                    width=edge_widths[i]
+                    color=f'rgba(52, 152, 219, {0.3 + relevance * 0.5})',
+                    width=1 + relevance * 4
                 ),
                 hoverinfo='none',
                 showlegend=False
             )
-            edge_traces.append(edge_trace)
+            for relevance, (edge_x, edge_y) in bucket_coords.items()
+        ]
 
         # 创建节点
-        node_trace = go.Scatter(
+        node_trace = scatter_cls(
             x=x_coords,
             y=y_coords,
             mode='markers+text',
@@ -134,7 +163,7 @@ class ThemeNetworkGraph:
             textfont=dict(size=10),
             hovertext=node_labels,
             hoverinfo='text',
-            customdata=[n['id'] for n in nodes],
+            customdata=node_ids,
             showlegend=False
         )
 
@@ -175,86 +204,66 @@ class ThemeNetworkGraph:
 
     def _calculate_layout(self, nodes: List[Dict], edges: List[tuple],
                          layout_type: str) -> Dict[str, Dict[str, float]]:
+        """计算节点位置（按拓扑结构缓存在会话中）"""
+        topo_key = hash((
+            frozenset((node['id'], node['type']) for node in nodes),
+            frozenset(edges),
+            layout_type
+        ))
+        cache = st.session_state.setdefault('_layout_cache', OrderedDict())
+        positions = cache.get(topo_key)
+        if positions is not None:
+            cache.move_to_end(topo_key)
+            return positions
+
+        positions = self._compute_layout(nodes, edges, layout_type)
+        cache[topo_key] = positions
+        while len(cache) > LAYOUT_CACHE_SIZE:
+            cache.popitem(last=False)
+        return positions
+
+    def _compute_layout(self, nodes: List[Dict], edges: List[tuple],
+                        layout_type: str) -> Dict[str, Dict[str, float]]:
         """计算节点位置"""
-        positions = {}
+        graph = nx.Graph()
+        graph.add_nodes_from(node['id'] for node in nodes)
+        graph.add_edges_from(
+            (source, target) for source, target in edges
+            if source in graph and target in graph
+        )
 
         if layout_type == "circular":
             # 圆形布局
-            import math
-            n = len(nodes)
-            for i, node in enumerate(nodes):
-                angle = 2 * math.pi * i / n
-                positions[node['id']] = {
-                    'x': math.cos(angle),
-                    'y': math.sin(angle)
-                }
+            layout = nx.circular_layout(graph)
 
         elif layout_type == "hierarchical":
-            # 层级布局：主题在上，编码在下
-            theme_y = 0.8
-            code_y = 0.2
-
-            # 放置主题
-            themes = [n for n in nodes if n['type'] == 'theme']
-            for i, theme in enumerate(themes):
-                x = (i + 1) / (len(themes) + 1)
-                positions[theme['id']] = {'x': x, 'y': theme_y}
-
-            # 放置编码
-            codes = [n for n in nodes if n['type'] == 'code']
-            for i, code in enumerate(codes):
-                x = (i + 1) / (len(codes) + 1)
-                positions[code['id']] = {'x': x, 'y': code_y}
+            # 层级布局：主题在上（y=0.8），编码在下（y=0.2），每层横向均匀分布
+            # （multipartite_layout 按最宽的一层等比缩放两轴，节点多时两层会挤在一起）
+            layout = {}
+            for node_type, y in (('theme', 0.8), ('code', 0.2)):
+                layer = [node['id'] for node in nodes if node['type'] == node_type]
+                for i, node_id in enumerate(layer):
+                    layout[node_id] = ((i + 1) / (len(layer) + 1), y)
 
         else:  # spring (default)
-            # 简化的力导向布局
-            import random
-            random.seed(42)
-
-            # 初始化随机位置
-            for node in nodes:
-                positions[node['id']] = {
-                    'x': random.random(),
-                    'y': random.random()
-                }
-
-            # 简单的迭代优化
-            for _ in range(50):
-                for node_id in positions:
-                    dx, dy = 0, 0
-
-                    # 斥力：推开所有节点
-                    for other_id in positions:
-                        if node_id == other_id:
-                            continue
-                        diff_x = positions[node_id]['x'] - positions[other_id]['x']
-                        diff_y = positions[node_id]['y'] - positions[other_id]['y']
-                        dist = max(0.01, (diff_x**2 + diff_y**2)**0.5)
-                        force = 0.01 / dist**2
-                        dx += diff_x / dist * force
-                        dy += diff_y / dist * force
-
-                    # 引力：拉近连接的节点
-                    for source, target in edges:
-                        if source == node_id:
-                            other_id = target
-                        elif target == node_id:
-                            other_id = source
-                        else:
-                            continue
-
-                        diff_x = positions[node_id]['x'] - positions[other_id]['x']
-                        diff_y = positions[node_id]['y'] - positions[other_id]['y']
-                        dist = max(0.01, (diff_x**2 + diff_y**2)**0.5)
-                        force = dist * 0.01
-                        dx -= diff_x / dist * force
-                        dy -= diff_y / dist * force
-
-                    # 更新位置（限制在0-1范围内）
-                    positions[node_id]['x'] = max(0.1, min(0.9, positions[node_id]['x'] + dx))
-                    positions[node_id]['y'] = max(0.1, min(0.9, positions[node_id]['y'] + dy))
+            # 力导向布局（限制在0.1-0.9范围内）
+            # 节点数达到500时 networkx 使用 scipy 稀疏求解器（scipy 为必需依赖）
+            layout = nx.spring_layout(
+                graph, seed=42, iterations=50,
+                center=(0.5, 0.5), scale=0.4
+            )
+
+        return {
+            node_id: {'x': float(xy[0]), 'y': float(xy[1])}
+            for node_id, xy in layout.items()
+        }
 
-        return positions
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _build_network_figure(content_key: str, layout_type: str,
+                          _graph: ThemeNetworkGraph) -> Dict[str, Any]:
+    """按内容哈希缓存网络图，_graph 不参与缓存键计算"""
+    return _graph._build_figure(layout_type).to_dict()
 
 
 class CodingFrequencyChart:
@@ -280,7 +289,7 @@ class CodingFrequencyChart:
             Plotly Figure对象
         """
         # 按使用频率排序
-        sorted_codes = sorted(self.codes, key=lambda x: x.get('usage_count', 0), reverse=True)[:top_n]
+        sorted_codes = heapq.nlargest(top_n, self.codes, key=lambda x: x.get('usage_count', 0))
 
         code_names = [code.get('name', '未知') for code in sorted_codes]
         usage_counts = [code.get('usage_count', 0) for code in sorted_codes]
@@ -323,24 +332,16 @@ class CodingFrequencyChart:
         code_names = [code.get('name', '未知') for code in self.codes]
         doc_names = [doc.get('filename', '未知') for doc in documents]
 
-        # 构建矩阵
-        matrix = []
-        for doc in documents:
-            row = []
-            doc_codings = doc.get('codings', [])
-            doc_code_ids = {c.get('code_id') for c in doc_codings}
-
-            for code in self.codes:
-                if code['id'] in doc_code_ids:
-                    # 计算该编码在此文档中的使用次数
-                    count = sum(1 for c in doc_codings if c.get('code_id') == code['id'])
-                    row.append(count)
-                else:
-                    row.append(0)
-            matrix.append(row)
-
-        # 转置矩阵（编码在Y轴，文档在X轴）
-        matrix = list(zip(*matrix)) if matrix else []
+        # 构建矩阵（编码在Y轴，文档在X轴）
+        code_idx = {code['id']: i for i, code in enumerate(self.codes)}
+        matrix = np.zeros((len(self.codes), len(documents)), dtype=np.int32)
+        for j, doc in enumerate(documents):
+            # 统计每个编码在此文档中的使用次数
+            counts = Counter(c.get('code_id') for c in doc.get('codings', []))
+            for code_id, count in counts.items():
+                i = code_idx.get(code_id)
+                if i is not None:
+                    matrix[i, j] = count
 
         fig = go.Figure(data=go.Heatmap(
             z=matrix,
@@ -380,8 +381,6 @@ class ThemeStatsChart:
         Returns:
             Plotly Figure对象（包含子图）
         """
-        from plotly.subplots import make_subplots
-
         theme_names = [t.get('name', '未知') for t in self.themes]
         code_counts = [len(t.get('codes', [])) for t in self.themes]
         coding_counts = [t.get('coding_count', 0) for t in self.themes]
@@ -440,26 +439,24 @@ class ThemeStatsChart:
         Returns:
             Plotly Figure对象
         """
-        labels = []
-        parents = []
-        values = []
-        colors = []
-
-        # 添加主题节点
-        for theme in self.themes:
-            theme_name = theme.get('name', '未知')
-            labels.append(theme_name)
-            parents.append('')
-            values.append(len(theme.get('codes', [])))
-            colors.append('#3498db')
-
-            # 添加编码节点
-            for code in theme.get('codes', []):
-                code_name = code.get('name', '未知')
-                labels.append(code_name)
-                parents.append(theme_name)
-                values.append(code.get('coding_count', 1))
-                colors.append(code.get('color', '#95a5a6'))
+        theme_codes = [(theme.get('name', '未知'), theme.get('codes', [])) for theme in self.themes]
+
+        # 主题节点在前，编码节点在后
+        labels = [name for name, _ in theme_codes] + [
+            code.get('name', '未知') for _, t_codes in theme_codes for code in t_codes
+        ]
+        parents = [''] * len(theme_codes) + [
+            name for name, t_codes in theme_codes for _ in t_codes
+        ]
+        values = np.asarray(
+            [len(t_codes) for _, t_codes in theme_codes] + [
+                code.get('coding_count', 1) for _, t_codes in theme_codes for code in t_codes
+            ],
+            dtype=np.int32
+        )
+        colors = ['#3498db'] * len(theme_codes) + [
+            code.get('color', '#95a5a6') for _, t_codes in theme_codes for code in t_codes
+        ]
 
         fig = go.Figure(go.Sunburst(
             labels=labels,
@@ -477,6 +474,50 @@ class ThemeStatsChart:
         return fig
 
 
+@st.cache_data(ttl=600, show_spinner=False)
+def _theme_network_figure(project_id: str, data_version: int) -> Dict[str, Any]:
+    """构建主题网络图并以可序列化的字典形式缓存"""
+    db = get_db()
+    themes = db.list_themes(project_id)
+    codes = db.list_codes(project_id)
+    associations = db.get_theme_code_associations(project_id)
+
+    # 为每个主题添加关联编码（单次查询后按主题分组）
+    theme_codes = db.get_all_theme_codes(project_id)
+    for theme in themes:
+        theme['codes'] = theme_codes.get(theme['id'], [])
+
+    graph = ThemeNetworkGraph(themes, codes, associations)
+    return graph.create_network_graph().to_dict()
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _coding_frequency_figure(project_id: str, data_version: int) -> Dict[str, Any]:
+    """构建编码频率图并以可序列化的字典形式缓存"""
+    db = get_db()
+    codes = db.list_codes(project_id, include_stats=True)
+
+    chart = CodingFrequencyChart(codes)
+    return chart.create_bar_chart().to_dict()
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _theme_overview_figure(project_id: str, data_version: int) -> Dict[str, Any]:
+    """构建主题概览图并以可序列化的字典形式缓存"""
+    db = get_db()
+    themes = db.list_themes(project_id)
+
+    # 为每个主题添加编码统计（单次查询后按主题分组）
+    theme_codes = db.get_all_theme_codes_with_stats(project_id)
+    for theme in themes:
+        codes = theme_codes.get(theme['id'], [])
+        theme['codes'] = codes
+        theme['coding_count'] = sum(c.get('coding_count', 0) for c in codes)
+
+    chart = ThemeStatsChart(themes)
+    return chart.create_theme_overview().to_dict()
+
+
 def create_theme_network(project_id: str) -> go.Figure:
     """
     便捷函数：为项目创建主题网络图
@@ -487,19 +528,7 @@ def create_theme_network(project_id: str) -> go.Figure:
     Returns:
         Plotly Figure对象
     """
-    from src.utils.database import get_db
-
-    db = get_db()
-    themes = db.list_themes(project_id)
-    codes = db.list_codes(project_id)
-    associations = db.get_theme_code_associations(project_id)
-
-    # 为每个主题添加关联编码
-    for theme in themes:
-        theme['codes'] = db.get_theme_codes(theme['id'])
-
-    graph = ThemeNetworkGraph(themes, codes, associations)
-    return graph.create_network_graph()
+    return go.Figure(_theme_network_figure(project_id, get_db().get_data_version()))
 
 
 def create_coding_frequency_chart(project_id: str) -> go.Figure:
@@ -512,13 +541,7 @@ def create_coding_frequency_chart(project_id: str) -> go.Figure:
     Returns:
         Plotly Figure对象
     """
-    from src.utils.database import get_db
-
-    db = get_db()
-    codes = db.list_codes(project_id, include_stats=True)
-
-    chart = CodingFrequencyChart(codes)
-    return chart.create_bar_chart()
+    return go.Figure(_coding_frequency_figure(project_id, get_db().get_data_version()))
 
 
 def create_theme_overview_chart(project_id: str) -> go.Figure:
@@ -531,16 +554,4 @@ def create_theme_overview_chart(project_id: str) -> go.Figure:
     Returns:
         Plotly Figure对象
     """
-    from src.utils.database import get_db
-
-    db = get_db()
-    themes = db.list_themes(project_id)
-
-    # 为每个主题添加编码统计
-    for theme in themes:
-        codes = db.get_theme_codes_with_stats(theme['id'])
-        theme['codes'] = codes
-        theme['coding_count'] = sum(c.get('coding_count', 0) for c in codes)
-
-    chart = ThemeStatsChart(themes)
-    return chart.create_theme_overview()
+    return go.Figure(_theme_overview_figure(project_id, get_db().get_data_version()))
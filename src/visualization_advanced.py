@@ -9,24 +9,62 @@ from typing import List, Dict, Optional, Any
 import numpy as np
 
 
-def create_code_document_heatmap(codes: List[Dict], documents: List[Dict] = None) -> go.Figure:
+# 超过该行数的热力图将低频编码合并为“其他”行
+HEATMAP_MAX_ROWS = 200
+# 共现网络最多绘制的边数（按权重保留最高的边）
+NETWORK_MAX_EDGES = 500
+
+
+def _collapse_rows(names: List[str], matrix: np.ndarray, weights: np.ndarray,
+                   max_rows: int) -> tuple:
+    """
+    行数超过上限时保留权重最高的 max_rows-1 行（保持原顺序），其余合并为“其他”行
+    
+    Args:
+        names: 行名称
+        matrix: 行数据矩阵
+        weights: 每行的排序权重
+        max_rows: 最大行数
+        
+    Returns:
+        (行名称, 行数据矩阵)
+    """
+    if len(names) <= max_rows:
+        return names, matrix
+    
+    order = np.argsort(-weights, kind='stable')
+    head = np.sort(order[:max_rows - 1])
+    tail = order[max_rows - 1:]
+    
+    collapsed = np.vstack([matrix[head], matrix[tail].sum(axis=0, keepdims=True)])
+    collapsed_names = [names[i] for i in head.tolist()]
+    collapsed_names.append(f"其他（{len(tail)}个编码）")
+    return collapsed_names, collapsed
+
+
+def create_code_document_heatmap(codes: List[Dict], documents: List[Dict] = None,
+                                 max_rows: int = HEATMAP_MAX_ROWS) -> go.Figure:
     """
     创建编码-文档热力图
     
     Args:
         codes: 编码列表
         documents: 文档列表（如果为None，使用单文档模式）
+        max_rows: 最大显示的编码行数，超出部分合并为“其他”行
         
     Returns:
         Plotly Figure对象
     """
+    quote_counts = np.array([len(c.get('quotes', [])) for c in codes], dtype=np.int32)
+    
     if documents is None or len(documents) == 0:
         # 单文档模式：显示编码使用频率
-        code_names = [c['name'] for c in codes]
-        code_counts = [len(c.get('quotes', [])) for c in codes]
+        code_names, data = _collapse_rows(
+            [c['name'] for c in codes], quote_counts.reshape(-1, 1), quote_counts, max_rows
+        )
         
         # 创建简单的条形图形式的热力图
-        data = [[count] for count in code_counts]
+        data = data.tolist()
         
         fig = go.Figure(data=go.Heatmap(
             z=data,
@@ -43,39 +81,38 @@ def create_code_document_heatmap(codes: List[Dict], documents: List[Dict] = None
             title='编码使用频率热力图',
             xaxis_title='',
             yaxis_title='编码',
-            height=max(400, len(codes) * 30),
+            height=max(400, len(code_names) * 30),
             margin=dict(l=150)
         )
     
     else:
         # 多文档模式
-        code_names = [c['name'] for c in codes]
         doc_names = [d.get('filename', f"文档{i+1}") for i, d in enumerate(documents)]
         
-        # 创建矩阵
-        matrix = np.zeros((len(codes), len(documents)))
+        # 创建矩阵：每个编码的引用只遍历一次，按文档ID定位列
+        doc_index = {d.get('id'): j for j, d in enumerate(documents)}
+        matrix = np.zeros((len(codes), len(documents)), dtype=np.int32)
         
         for i, code in enumerate(codes):
-            for j, doc in enumerate(documents):
-                # 统计该编码在该文档中的使用次数
-                # 这里需要根据实际数据结构调整
-                count = 0
-                if 'quotes' in code:
-                    for quote in code['quotes']:
-                        if isinstance(quote, dict) and quote.get('document_id') == doc.get('id'):
-                            count += 1
-                        elif isinstance(quote, str):
-                            # 简单模式：所有引用都算在第一个文档
-                            if j == 0:
-                                count += 1
-                matrix[i, j] = count
+            for quote in code.get('quotes', []):
+                if isinstance(quote, dict):
+                    j = doc_index.get(quote.get('document_id'))
+                    if j is not None:
+                        matrix[i, j] += 1
+                elif isinstance(quote, str):
+                    # 简单模式：所有引用都算在第一个文档
+                    matrix[i, 0] += 1
+        
+        code_names, matrix = _collapse_rows(
+            [c['name'] for c in codes], matrix, quote_counts, max_rows
+        )
         
         fig = go.Figure(data=go.Heatmap(
             z=matrix,
             x=doc_names,
             y=code_names,
             colorscale='Viridis',
-            text=matrix.astype(int),
+            text=matrix,
             texttemplate='%{text}',
             textfont={"size": 10},
             hovertemplate='编码: %{y}<br>文档: %{x}<br>次数: %{z}<extra></extra>'
@@ -85,7 +122,7 @@ def create_code_document_heatmap(codes: List[Dict], documents: List[Dict] = None
             title='编码-文档热力图',
             xaxis_title='文档',
             yaxis_title='编码',
-            height=max(400, len(codes) * 30),
+            height=max(400, len(code_names) * 30),
             margin=dict(l=150, b=100)
         )
     
@@ -103,6 +140,12 @@ def create_theme_hierarchy_sunburst(themes: List[Dict], codes: List[Dict]) -> go
     Returns:
         Plotly Figure对象
     """
+    # 按名称索引编码（同名时保留第一个）及其引用数
+    code_by_name = {}
+    for c in codes:
+        code_by_name.setdefault(c['name'], c)
+    quote_counts = {name: len(c.get('quotes', [])) for name, c in code_by_name.items()}
+    
     # 构建层级数据
     labels = ['全部主题']
     parents = ['']
@@ -120,15 +163,11 @@ def create_theme_hierarchy_sunburst(themes: List[Dict], codes: List[Dict]) -> go
         colors.append('#3498db')
         
         # 添加编码层
-        for code_name in related_codes:
-            # 查找编码详情
-            code = next((c for c in codes if c['name'] == code_name), None)
-            if code:
-                quote_count = len(code.get('quotes', []))
-                labels.append(f"{code_name}")
-                parents.append(theme_name)
-                values.append(quote_count if quote_count > 0 else 1)
-                colors.append('#95a5a6')
+        found = [code_name for code_name in related_codes if code_name in code_by_name]
+        labels.extend(found)
+        parents.extend([theme_name] * len(found))
+        values.extend(quote_counts[code_name] or 1 for code_name in found)
+        colors.extend(['#95a5a6'] * len(found))
     
     fig = go.Figure(go.Sunburst(
         labels=labels,
@@ -177,13 +216,14 @@ def create_timeline_visualization(events: List[Dict]) -> go.Figure:
     # 准备数据
     times = [e.get('time', '') for e in sorted_events]
     event_texts = [e.get('event', '') for e in sorted_events]
-    categories = [e.get('category', '未分类') for e in sorted_events]
+    # 类别统一为非空字符串（None 与字符串混合时 np.unique 无法排序）
+    categories = [str(e.get('category') or '未分类') for e in sorted_events]
     
-    # 为每个类别分配颜色
-    unique_categories = list(set(categories))
-    color_map = {cat: px.colors.qualitative.Set3[i % len(px.colors.qualitative.Set3)] 
-                 for i, cat in enumerate(unique_categories)}
-    colors = [color_map[cat] for cat in categories]
+    # 为每个类别分配颜色（一次向量化索引完成）
+    palette = np.array(px.colors.qualitative.Set3)
+    unique_categories, inverse = np.unique(np.array(categories), return_inverse=True)
+    colors = palette[inverse.ravel() % len(palette)].tolist()
+    category_colors = palette[np.arange(len(unique_categories)) % len(palette)].tolist()
     
     # 创建散点图
     fig = go.Figure()
@@ -206,9 +246,9 @@ def create_timeline_visualization(events: List[Dict]) -> go.Figure:
         showlegend=False
     ))
     
-    # 添加事件文本
-    for i, (time, event, color) in enumerate(zip(times, event_texts, colors)):
-        fig.add_annotation(
+    # 事件文本标注（一次性写入布局）
+    annotations = [
+        dict(
             x=i,
             y=1.3,
             text=event[:50] + '...' if len(event) > 50 else event,
@@ -223,9 +263,12 @@ def create_timeline_visualization(events: List[Dict]) -> go.Figure:
             opacity=0.8,
             font=dict(size=10, color='white')
         )
+        for i, (event, color) in enumerate(zip(event_texts, colors))
+    ]
     
     fig.update_layout(
         title='事件时间线',
+        annotations=annotations,
         xaxis=dict(
             showgrid=False,
             showticklabels=False,
@@ -243,19 +286,26 @@ def create_timeline_visualization(events: List[Dict]) -> go.Figure:
     )
     
     # 添加图例
-    for cat in unique_categories:
-        fig.add_trace(go.Scatter(
+    fig.add_traces([
+        go.Scatter(
             x=[None],
             y=[None],
             mode='markers',
-            marker=dict(size=10, color=color_map[cat]),
+            marker=dict(size=10, color=color),
             name=cat,
             showlegend=True
-        ))
+        )
+        for cat, color in zip(unique_categories.tolist(), category_colors)
+    ])
     
     return fig
 
 
+_SENTIMENT_CATEGORIES = ['positive', 'neutral', 'negative', 'mixed']
+_SENTIMENT_NUM_LUT = np.array([1, 0, -1, 0.5, 0])
+_SENTIMENT_COLOR_LUT = np.array(['#2ecc71', '#95a5a6', '#e74c3c', '#f39c12', '#95a5a6'])
+
+
 def create_sentiment_timeline(timeline_data: Dict) -> go.Figure:
     """
     创建情感时间线可视化
@@ -270,25 +320,10 @@ def create_sentiment_timeline(timeline_data: Dict) -> go.Figure:
     sentiments = timeline_data['timeline']['sentiments']
     intensities = timeline_data['timeline']['intensities']
     
-    # 情感到数值的映射
-    sentiment_values = {
-        'positive': 1,
-        'neutral': 0,
-        'negative': -1,
-        'mixed': 0.5
-    }
-    
-    sentiment_nums = [sentiment_values.get(s, 0) for s in sentiments]
-    
-    # 情感到颜色的映射
-    sentiment_colors = {
-        'positive': '#2ecc71',
-        'neutral': '#95a5a6',
-        'negative': '#e74c3c',
-        'mixed': '#f39c12'
-    }
-    
-    colors = [sentiment_colors.get(s, '#95a5a6') for s in sentiments]
+    # 情感类别到数值/颜色的查找表，末项为未知情感的默认值（中性），对应类别编码 -1
+    codes = pd.Categorical(sentiments, categories=_SENTIMENT_CATEGORIES).codes
+    sentiment_nums = _SENTIMENT_NUM_LUT[codes]
+    colors = _SENTIMENT_COLOR_LUT[codes].tolist()
     
     fig = go.Figure()
     
@@ -336,40 +371,67 @@ def create_sentiment_timeline(timeline_data: Dict) -> go.Figure:
     return fig
 
 
-def create_code_cooccurrence_network(codes: List[Dict], min_cooccurrence: int = 2) -> go.Figure:
+def _quote_key(quote: Any) -> Optional[str]:
+    """
+    获取引用的标识，用于判断两个编码是否引用了同一片段
+
+    Args:
+        quote: 引用（字符串或包含id/text的字典）
+
+    Returns:
+        引用标识，无法识别时返回None
+    """
+    if isinstance(quote, dict):
+        return quote.get('id') or quote.get('text')
+    if isinstance(quote, str):
+        return quote
+    return None
+
+
+def create_code_cooccurrence_network(codes: List[Dict], min_cooccurrence: int = 2,
+                                     max_edges: int = NETWORK_MAX_EDGES) -> go.Figure:
     """
     创建编码共现网络图
     
+    两个编码引用了同一文本片段即视为一次共现
+    
     Args:
         codes: 编码列表
         min_cooccurrence: 最小共现次数阈值
+        max_edges: 最多绘制的边数，超出时只保留共现次数最高的边
         
     Returns:
         Plotly Figure对象
     """
-    # 构建共现矩阵
+    # 构建共现矩阵：M[i, q] 表示编码i是否包含引用q，共现次数即 M @ M.T
     code_names = [c['name'] for c in codes]
     n = len(code_names)
-    cooccurrence = np.zeros((n, n))
-    
-    # 计算共现（这里简化处理，实际需要根据文本片段计算）
-    # 假设在同一主题下的编码视为共现
-    for i in range(n):
-        for j in range(i+1, n):
-            # 简化：随机生成共现（实际应基于真实数据）
-            count = np.random.randint(0, 5)
-            cooccurrence[i, j] = count
-            cooccurrence[j, i] = count
-    
-    # 创建网络图
-    edges = []
-    edge_weights = []
-    
-    for i in range(n):
-        for j in range(i+1, n):
-            if cooccurrence[i, j] >= min_cooccurrence:
-                edges.append((i, j))
-                edge_weights.append(cooccurrence[i, j])
+    
+    quote_index = {}
+    rows, cols = [], []
+    for i, code in enumerate(codes):
+        for quote in code.get('quotes', []):
+            key = _quote_key(quote)
+            if key is None:
+                continue
+            rows.append(i)
+            cols.append(quote_index.setdefault(key, len(quote_index)))
+    
+    membership = np.zeros((n, len(quote_index)), dtype=np.int32)
+    membership[rows, cols] = 1
+    cooccurrence = membership @ membership.T
+    np.fill_diagonal(cooccurrence, 0)
+    
+    # 筛选达到阈值的边（只取上三角）
+    ii, jj = np.triu_indices(n, k=1)
+    keep = cooccurrence[ii, jj] >= min_cooccurrence
+    ii, jj = ii[keep], jj[keep]
+    edge_weights = cooccurrence[ii, jj]
+    
+    if len(edge_weights) > max_edges:
+        top = np.sort(np.argsort(edge_weights, kind='stable')[-max_edges:])
+        ii, jj, edge_weights = ii[top], jj[top], edge_weights[top]
+    edges = list(zip(ii.tolist(), jj.tolist()))
     
     if not edges:
         fig = go.Figure()
@@ -380,37 +442,37 @@ def create_code_cooccurrence_network(codes: List[Dict], min_cooccurrence: int =
         )
         return fig
     
-    # 使用力导向布局计算位置
-    import math
-    positions = {}
-    radius = 1
-    for i, code_name in enumerate(code_names):
-        angle = 2 * math.pi * i / n
-        positions[i] = (radius * math.cos(angle), radius * math.sin(angle))
+    # 圆形布局计算位置
+    angles = 2 * np.pi * np.arange(n) / n
+    xs = np.cos(angles)
+    ys = np.sin(angles)
+    positions = dict(enumerate(zip(xs.tolist(), ys.tolist())))
     
-    # 创建边
-    edge_traces = []
+    # 创建边：按线宽分档（最多5档），每档合并为一条用None分隔的轨迹
+    bucket_coords = {}
     for (i, j), weight in zip(edges, edge_weights):
         x0, y0 = positions[i]
         x1, y1 = positions[j]
-        
-        edge_trace = go.Scatter(
-            x=[x0, x1, None],
-            y=[y0, y1, None],
+        edge_x, edge_y = bucket_coords.setdefault(min(int(weight), 5), ([], []))
+        edge_x += [x0, x1, None]
+        edge_y += [y0, y1, None]
+    
+    edge_traces = [
+        go.Scatter(
+            x=edge_x,
+            y=edge_y,
             mode='lines',
-            line=dict(width=weight, color='rgba(125, 125, 125, 0.5)'),
+            line=dict(width=width, color='rgba(125, 125, 125, 0.5)'),
             hoverinfo='none',
             showlegend=False
         )
-        edge_traces.append(edge_trace)
+        for width, (edge_x, edge_y) in sorted(bucket_coords.items())
+    ]
     
     # 创建节点
-    node_x = [positions[i][0] for i in range(n)]
-    node_y = [positions[i][1] for i in range(n)]
-    
     node_trace = go.Scatter(
-        x=node_x,
-        y=node_y,
+        x=xs,
+        y=ys,
         mode='markers+text',
         marker=dict(
             size=20,
@@ -457,23 +519,28 @@ def create_theme_comparison_radar(themes: List[Dict], metrics: List[str] = None)
     
     fig = go.Figure()
     
-    for theme in themes[:6]:  # 最多显示6个主题
-        # 计算各项指标（这里用随机值演示，实际应基于真实数据）
-        values = []
-        for metric in metrics:
-            if metric == '编码数量':
-                value = len(theme.get('codes', [])) / 10  # 归一化
-            elif metric == '引用数量':
-                value = len(theme.get('quotes', [])) / 10
-            else:
-                value = np.random.random()  # 其他指标用随机值
-            values.append(min(value, 1.0))  # 确保在0-1之间
-        
+    shown_themes = themes[:6]  # 最多显示6个主题
+    
+    # 计算各项指标（主题×指标矩阵；其他指标用固定种子的随机值演示，实际应基于真实数据）
+    rng = np.random.default_rng(42)
+    scores = rng.random((len(shown_themes), len(metrics)))
+    code_counts = np.array([len(t.get('codes', [])) for t in shown_themes], dtype=float) / 10  # 归一化
+    quote_counts = np.array([len(t.get('quotes', [])) for t in shown_themes], dtype=float) / 10
+    for j, metric in enumerate(metrics):
+        if metric == '编码数量':
+            scores[:, j] = code_counts
+        elif metric == '引用数量':
+            scores[:, j] = quote_counts
+    np.clip(scores, 0, 1, out=scores)  # 确保在0-1之间
+    
+    theta = metrics + [metrics[0]]
+    for theme, row in zip(shown_themes, scores):
+        values = row.tolist()
         values.append(values[0])  # 闭合雷达图
         
         fig.add_trace(go.Scatterpolar(
             r=values,
-            theta=metrics + [metrics[0]],
+            theta=theta,
             fill='toself',
             name=theme['name']
         ))
@@ -520,15 +587,20 @@ def create_coding_evolution_chart(evolution_data: List[Dict]) -> go.Figure:
     
     # 统计每个版本的新增、删除、修改
     if len(evolution_data) > 1:
-        added = []
-        removed = []
+        # 编码×版本的出现矩阵，相邻版本作差得到新增(+1)/删除(-1)
+        name_to_row = {}
+        for d in evolution_data:
+            for c in d['codes']:
+                name_to_row.setdefault(c['name'], len(name_to_row))
+        
+        presence = np.zeros((len(name_to_row), len(evolution_data)), dtype=np.int8)
+        for j, d in enumerate(evolution_data):
+            rows = [name_to_row[c['name']] for c in d['codes']]
+            presence[rows, j] = 1
         
-        for i in range(1, len(evolution_data)):
-            prev_codes = set(c['name'] for c in evolution_data[i-1]['codes'])
-            curr_codes = set(c['name'] for c in evolution_data[i]['codes'])
-            
-            added.append(len(curr_codes - prev_codes))
-            removed.append(len(prev_codes - curr_codes))
+        delta = np.diff(presence, axis=1)
+        added = (delta == 1).sum(axis=0).tolist()
+        removed = (delta == -1).sum(axis=0).tolist()
         
         fig.add_trace(go.Bar(
             x=versions[1:],
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""utils.cache 测试"""
+
+import pytest
+
+from utils import cache as cache_module
+from utils.cache import cached, generate_cache_key
+
+pytest.importorskip("diskcache")
+
+
+class _Opaque:
+    """不可JSON序列化的参数"""
+
+
+def test_id_based_keys_stay_in_memory(tmp_path):
+    """含对象ID的键只写入L1，值可序列化的键同时写入L2"""
+    backend = cache_module.DiskCacheBackend(directory=tmp_path)
+
+    @cached(cache_instance=backend)
+    def compute(x):
+        return "result"
+
+    compute(_Opaque())
+    assert len(backend._disk) == 0
+
+    compute({"a": 1})
+    assert len(backend._disk) == 1
+
+
+def test_generate_cache_key_marks_id_based_keys():
+    assert not isinstance(generate_cache_key("f", ({"a": 1},), {}), cache_module._MemoryOnlyKey)
+    assert isinstance(generate_cache_key("f", (_Opaque(),), {}), cache_module._MemoryOnlyKey)
+    assert isinstance(generate_cache_key("f", (), {"x": [_Opaque()]}), cache_module._MemoryOnlyKey)
+
+
+def test_cache_stats_include_llm_cache(tmp_path, monkeypatch):
+    """全局统计包含LLM结果缓存的L1/L2统计"""
+    backend = cache_module.DiskCacheBackend(directory=tmp_path)
+    monkeypatch.setattr(cache_module, "_llm_cache", backend)
+    before = cache_module.get_cache_stats()
+
+    backend.set("k", "v")
+    assert backend.get("k") == "v"
+    assert backend.get("missing") is None
+
+    stats = cache_module.get_cache_stats()
+    assert stats['hits'] == before['hits'] + 1
+    assert stats['misses'] == before['misses'] + 1
+    assert stats['size'] == before['size'] + 1
+    assert stats['disk_size'] == 1
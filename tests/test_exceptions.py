@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""utils.exceptions 测试"""
+
+from utils.exceptions import TRACEBACK_LIMIT, _format_traceback
+
+
+def _raise_at_depth(depth: int):
+    if depth == 0:
+        raise ValueError("innermost")
+    _raise_at_depth(depth - 1)
+
+
+def test_format_traceback_keeps_innermost_frames():
+    """堆栈深度超过限制时保留抛出异常的帧"""
+    try:
+        _raise_at_depth(TRACEBACK_LIMIT * 2)
+    except ValueError as e:
+        formatted = _format_traceback(e)
+
+    assert 'raise ValueError("innermost")' in formatted
+    assert formatted.count("_raise_at_depth") <= TRACEBACK_LIMIT
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""utils.lazy_loader 测试"""
+
+import threading
+import time
+
+from utils import lazy_loader
+
+
+def test_nlp_model_loaded_once_under_concurrency(monkeypatch):
+    """并发首次请求同一模型时只加载一次"""
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    monkeypatch.setitem(lazy_loader._NLP_MODEL_LOADERS, "test_model", slow_loader)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(lazy_loader.get_nlp_model("test_model")))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    lazy_loader.reset_nlp_models()
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
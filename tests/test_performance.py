@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""utils.performance 测试"""
+
+import time
+
+import pytest
+
+from utils import performance
+
+
+def test_track_performance_records_by_default():
+    """默认启用追踪，被装饰函数的调用会计入统计"""
+    assert performance.is_tracking_enabled()
+
+    @performance.track_performance("test_default_tracking")
+    def work():
+        return 42
+
+    assert work() == 42
+    assert performance._global_tracker.get_stats("test_default_tracking")['count'] == 1
+
+
+def test_disable_tracking_skips_recording():
+    @performance.track_performance("test_disabled_tracking")
+    def work():
+        return 1
+
+    performance.disable_tracking()
+    try:
+        work()
+    finally:
+        performance.enable_tracking()
+
+    assert not performance._global_tracker.get_stats("test_disabled_tracking")
+
+
+def test_process_concurrent_cancels_queued_items_on_error():
+    """某一项出错时，排队中的项目不再执行"""
+    calls = []
+
+    def work(item):
+        calls.append(item)
+        if item == 0:
+            raise ValueError("boom")
+        time.sleep(0.01)
+        return item
+
+    processor = performance.ConcurrentProcessor(max_workers=1)
+
+    with pytest.raises(ValueError):
+        processor.process_concurrent(list(range(50)), work, show_progress=False)
+
+    assert len(calls) < 5
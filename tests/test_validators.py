@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""utils.validators 测试"""
+
+import pytest
+
+from utils.exceptions import DataValidationError
+from utils.validators import sanitize_html, validate
+
+
+# ==================== sanitize_html ====================
+
+@pytest.mark.parametrize("text, expected", [
+    ("<p>Hello &amp; <b>世界</b></p><script>alert(1)</script>end", "Hello & 世界end"),
+    ("<SCRIPT src=x>bad()</SCRIPT>ok &lt;tag&gt;", "ok <tag>"),
+    # 游离的 '<' 不能吞掉后面的 <script>/<style> 开始标签
+    ("if 1 < 2 <script>steal(document.cookie)</script> ok", "if 1 < 2  ok"),
+    ("a<b <style>body{x:1}</style>c", "a<b c"),
+    # 未闭合的脚本块删到文本末尾
+    ("未闭合 <script>evil", "未闭合 "),
+])
+def test_sanitize_html(text, expected):
+    assert sanitize_html(text) == expected
+
+
+# ==================== ValidationBuilder ====================
+
+def test_validate_returns_independent_builders():
+    """验证通过后的构建器不会被其他 validate() 调用复用"""
+    builder = validate("abc", "名称").required()
+    assert builder.validate() == "abc"
+    assert builder.validate() == "abc"
+
+    other = validate("", "甲")
+    assert other is not builder
+
+    other.required()
+    assert builder.validate() == "abc"
+    assert builder.errors == []
+    with pytest.raises(DataValidationError):
+        other.validate()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""src.visualization 测试"""
+
+from src.visualization import ThemeNetworkGraph
+
+
+def _star_graph(n_themes: int, n_codes: int):
+    nodes = [{'id': f't{i}', 'type': 'theme'} for i in range(n_themes)]
+    nodes += [{'id': f'c{i}', 'type': 'code'} for i in range(n_codes)]
+    edges = [(f't{i % n_themes}', f'c{i}') for i in range(n_codes)]
+    return nodes, edges
+
+
+def test_spring_layout_large_graph():
+    """500个以上节点时（networkx 使用 scipy 求解）能得到全部节点的位置"""
+    nodes, edges = _star_graph(20, 600)
+    graph = ThemeNetworkGraph([], [], [])
+
+    positions = graph._compute_layout(nodes, edges, "spring")
+
+    assert len(positions) == len(nodes)
+    for xy in positions.values():
+        assert 0.1 - 1e-6 <= xy['x'] <= 0.9 + 1e-6
+        assert 0.1 - 1e-6 <= xy['y'] <= 0.9 + 1e-6
+
+
+def test_hierarchical_layout_keeps_layers_apart():
+    """层级布局中主题固定在 y=0.8，编码固定在 y=0.2，不随节点数压缩"""
+    nodes, edges = _star_graph(5, 200)
+    graph = ThemeNetworkGraph([], [], [])
+
+    positions = graph._compute_layout(nodes, edges, "hierarchical")
+
+    for node in nodes:
+        expected_y = 0.8 if node['type'] == 'theme' else 0.2
+        assert positions[node['id']]['y'] == expected_y
+    theme_x = [positions[f't{i}']['x'] for i in range(5)]
+    assert theme_x == sorted(theme_x)
+    assert 0 < theme_x[0] and theme_x[-1] < 1
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""src.visualization_advanced 测试"""
+
+from src.visualization_advanced import create_timeline_visualization
+
+
+def test_timeline_mixed_none_and_str_categories():
+    """类别中混有 None 和字符串时正常绘制，None 归入未分类"""
+    events = [
+        {"time": "2020年", "event": "事件一", "category": "政策"},
+        {"time": "2021年", "event": "事件二", "category": None},
+        {"time": "2022年", "event": "事件三"},
+        {"time": "2023年", "event": "事件四", "category": "政策"},
+    ]
+
+    fig = create_timeline_visualization(events)
+
+    legend_names = {trace.name for trace in fig.data if trace.showlegend is not False}
+    assert legend_names == {"政策", "未分类"}
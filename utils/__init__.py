@@ -35,6 +35,8 @@ from .validators import (
     sanitize_html,
     normalize_quotes,
     validate_batch,
+    validate_batch_iter,
+    validate_batch_parallel,
     validate,
     is_empty,
     truncate,
@@ -82,6 +84,8 @@ __all__ = [
     "sanitize_html",
     "normalize_quotes",
     "validate_batch",
+    "validate_batch_iter",
+    "validate_batch_parallel",
     "validate",
     "is_empty",
     "truncate",
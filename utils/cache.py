@@ -7,70 +7,259 @@ QualInsight 缓存装饰器模块
 import functools
 import hashlib
 import json
+import threading
 import time
-from typing import Callable, Any, Optional, Dict
+from collections import OrderedDict
+from concurrent.futures import Future
+from itertools import islice
+from typing import Callable, Any, Optional, Dict, Hashable
 from functools import wraps
+import streamlit as st
+
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
 
 
 # ==================== 缓存配置 ====================
 
 DEFAULT_CACHE_TTL = 3600  # 默认缓存1小时
 CACHE_VERSION = "v1"  # 缓存版本号
+DEFAULT_CACHE_MAXSIZE = 1024  # 默认最大缓存项数
+CACHE_SWEEP_INTERVAL = 64  # 每写入多少次检查一次过期项
+CACHE_SWEEP_LIMIT = 32  # 每次最多检查的缓存项数
+DISK_CACHE_SIZE_LIMIT = 2 ** 30  # 磁盘缓存容量上限（1GB）
 
 
 # ==================== 简单的内存缓存 ====================
 
 class SimpleCache:
-    """简单的内存缓存实现"""
-
-    def __init__(self):
-        self._cache: Dict[str, tuple] = {}  # key: (value, expire_time)
+    """简单的内存缓存实现（LRU淘汰，容量有上限，线程安全）"""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_MAXSIZE):
+        """
+        初始化缓存
+
+        Args:
+            maxsize: 最大缓存项数，超出时淘汰最久未使用的项
+        """
+        self._maxsize = maxsize
+        self._cache: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key: (value, expire_time)
+        self._sets_since_sweep = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._inflight_lock = threading.Lock()
         self._stats = {
             'hits': 0,
             'misses': 0,
             'sets': 0
         }
 
-    def get(self, key: str) -> Optional[Any]:
+    def get(self, key: Hashable) -> Optional[Any]:
         """获取缓存值"""
-        if key in self._cache:
-            value, expire_time = self._cache[key]
-            if expire_time is None or time.time() < expire_time:
-                self._stats['hits'] += 1
-                return value
-            else:
-                # 缓存过期
-                del self._cache[key]
-        self._stats['misses'] += 1
-        return None
-
-    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        return self._get(key, record_stats=True)
+
+    def _get(self, key: Hashable, record_stats: bool) -> Optional[Any]:
+        """获取缓存值，可选择是否计入命中统计"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                value, expire_time = entry
+                if expire_time is None or time.time() < expire_time:
+                    self._cache.move_to_end(key)
+                    if record_stats:
+                        self._stats['hits'] += 1
+                    return value
+                else:
+                    # 缓存过期
+                    del self._cache[key]
+            if record_stats:
+                self._stats['misses'] += 1
+            return None
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], ttl: Optional[int] = None) -> Any:
+        """
+        获取缓存值，未命中时计算并写入缓存
+
+        同一键的并发未命中只会执行一次 compute，其余调用等待并共享其结果（或异常）。
+
+        Args:
+            key: 缓存键
+            compute: 无参计算函数
+            ttl: 缓存生存时间（秒）
+
+        Returns:
+            缓存值或计算结果
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            # 领取计算权前，上一个计算者可能刚写入缓存
+            value = self._get(key, record_stats=False)
+            if value is None:
+                value = compute()
+                self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[int] = None) -> None:
         """设置缓存值"""
         expire_time = time.time() + ttl if ttl else None
+        with self._lock:
+            self._stats['sets'] += 1
+            self._store(key, value, expire_time)
+
+    def _store(self, key: Hashable, value: Any, expire_time: Optional[float]) -> None:
+        """写入缓存项并按容量淘汰（调用方需持有锁）"""
         self._cache[key] = (value, expire_time)
-        self._stats['sets'] += 1
+        self._cache.move_to_end(key)
+
+        while len(self._cache) > self._maxsize:
+            self._cache.popitem(last=False)
+
+        self._sets_since_sweep += 1
+        if self._sets_since_sweep >= CACHE_SWEEP_INTERVAL:
+            self._sets_since_sweep = 0
+            self._sweep_expired()
+
+    def _sweep_expired(self) -> None:
+        """从最久未使用端检查有限数量的缓存项，清除其中已过期的项（调用方需持有锁）"""
+        now = time.time()
+        expired = [
+            key for key, (_, expire_time) in islice(self._cache.items(), CACHE_SWEEP_LIMIT)
+            if expire_time is not None and now >= expire_time
+        ]
+        for key in expired:
+            del self._cache[key]
 
     def clear(self) -> None:
         """清空缓存"""
-        self._cache.clear()
+        with self._lock:
+            self._cache.clear()
 
     def get_stats(self) -> Dict[str, int]:
         """获取缓存统计"""
-        total = self._stats['hits'] + self._stats['misses']
-        hit_rate = self._stats['hits'] / total if total > 0 else 0
+        with self._lock:
+            stats = dict(self._stats)
+            size = len(self._cache)
+        total = stats['hits'] + stats['misses']
+        hit_rate = stats['hits'] / total if total > 0 else 0
         return {
-            **self._stats,
-            'size': len(self._cache),
+            **stats,
+            'size': size,
             'hit_rate': hit_rate
         }
 
 
+class DiskCacheBackend(SimpleCache):
+    """持久化缓存：内存LRU作为L1，diskcache作为跨进程共享的L2"""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        size_limit: int = DISK_CACHE_SIZE_LIMIT,
+        maxsize: int = DEFAULT_CACHE_MAXSIZE
+    ):
+        """
+        初始化磁盘缓存
+
+        Args:
+            directory: 缓存目录，默认为 config.LLM_CACHE_DIR
+            size_limit: 磁盘缓存容量上限（字节）
+            maxsize: 内存L1缓存最大项数
+        """
+        if not DISKCACHE_AVAILABLE:
+            raise ImportError("diskcache未安装，请运行: pip install diskcache")
+
+        super().__init__(maxsize)
+        if directory is None:
+            from config import LLM_CACHE_DIR
+            directory = LLM_CACHE_DIR
+        self._disk = diskcache.Cache(str(directory), size_limit=size_limit)
+
+    def _get(self, key: Hashable, record_stats: bool) -> Optional[Any]:
+        """先查L1，未命中再查L2，L2命中时回填L1（仅内存键只查L1）"""
+        if isinstance(key, _MemoryOnlyKey):
+            return super()._get(key, record_stats)
+
+        value = super()._get(key, record_stats=False)
+        if value is None:
+            value, expire_time = self._disk.get(key, expire_time=True)
+            if value is not None:
+                with self._lock:
+                    self._store(key, value, expire_time)
+
+        if record_stats:
+            with self._lock:
+                self._stats['hits' if value is not None else 'misses'] += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[int] = None) -> None:
+        """同时写入L1和L2（仅内存键只写入L1）"""
+        super().set(key, value, ttl)
+        if not isinstance(key, _MemoryOnlyKey):
+            self._disk.set(key, value, expire=ttl or None)
+
+    def clear(self) -> None:
+        """清空L1和L2"""
+        super().clear()
+        self._disk.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取缓存统计（size为L1项数，disk_size为L2项数）"""
+        return {
+            **super().get_stats(),
+            'disk_size': len(self._disk)
+        }
+
+
 # 全局缓存实例
 _global_cache = SimpleCache()
+_llm_cache: Optional[SimpleCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def _get_llm_cache() -> SimpleCache:
+    """获取LLM结果缓存，diskcache可用时使用持久化缓存，否则退回全局内存缓存"""
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                _llm_cache = DiskCacheBackend() if DISKCACHE_AVAILABLE else _global_cache
+    return _llm_cache
 
 
 # ==================== 缓存键生成 ====================
 
+class _MemoryOnlyKey(str):
+    """
+    包含对象ID的缓存键，只能存入内存缓存
+
+    对象ID在进程重启或跨进程后会被复用，写入磁盘缓存会导致后续运行命中
+    其他对象的陈旧结果。
+    """
+
+
 def generate_cache_key(func_name: str, args: tuple, kwargs: dict) -> str:
     """
     生成缓存键
@@ -81,43 +270,117 @@ def generate_cache_key(func_name: str, args: tuple, kwargs: dict) -> str:
         kwargs: 关键字参数
 
     Returns:
-        缓存键
+        缓存键；存在不可序列化的参数时为 _MemoryOnlyKey
     """
-    # 序列化参数
-    key_parts = [
-        CACHE_VERSION,
-        func_name,
-    ]
+    # 逐段写入哈希，避免拼接出完整的键字符串
+    hasher = hashlib.blake2b(digest_size=16)
+    _update_key_part(hasher, CACHE_VERSION)
+    _update_key_part(hasher, func_name)
+    value_based = True
 
-    # 添加位置参数（排除不可序列化的对象）
+    # 添加位置参数
     for arg in args:
-        if _is_json_serializable(arg):
-            key_parts.append(json.dumps(arg, sort_keys=True, ensure_ascii=False))
-        else:
-            # 对于不可序列化的对象，使用其类型和ID
-            key_parts.append(f"{type(arg).__name__}_{id(arg)}")
+        value_based &= _update_key_arg(hasher, arg)
 
     # 添加关键字参数
     if kwargs:
         sorted_kwargs = sorted(kwargs.items())
         for k, v in sorted_kwargs:
-            if _is_json_serializable(v):
-                key_parts.append(f"{k}:{json.dumps(v, sort_keys=True, ensure_ascii=False)}")
-            else:
-                key_parts.append(f"{k}:{type(v).__name__}_{id(v)}")
+            hasher.update(f"{k}:".encode())
+            value_based &= _update_key_arg(hasher, v)
+
+    key = hasher.hexdigest()
+    return key if value_based else _MemoryOnlyKey(key)
+
 
-    # 生成哈希
-    key_string = "|".join(key_parts)
-    return hashlib.md5(key_string.encode()).hexdigest()
+def _update_key_arg(hasher: Any, value: Any) -> bool:
+    """
+    向哈希对象写入一个参数
 
+    字符串和字节串带类型标记与长度前缀后直接写入，不经过JSON编码；
+    其他对象序列化为JSON，不可序列化的对象使用其类型和ID。
 
-def _is_json_serializable(obj: Any) -> bool:
-    """检查对象是否可以JSON序列化"""
-    try:
-        json.dumps(obj)
+    Returns:
+        写入的内容是否只取决于参数的值（使用了对象ID时为 False）
+    """
+    if isinstance(value, (str, bytes)):
+        if isinstance(value, str):
+            tag, data = b"S", value.encode()
+        else:
+            tag, data = b"B", value
+        hasher.update(tag + str(len(data)).encode() + b":")
+        hasher.update(data)
+        hasher.update(b"|")
         return True
-    except (TypeError, ValueError):
-        return False
+
+    serialized = _fast_serialize(value)
+    value_based = serialized is not None
+    if not value_based:
+        serialized = f"{type(value).__name__}_{id(value)}"
+    hasher.update(b"J")
+    _update_key_part(hasher, serialized)
+    return value_based
+
+
+_FAST_KEY_TYPES = frozenset((str, bytes, int, float, bool, type(None)))
+
+
+def _fast_cache_key(func_name: str, args: tuple, kwargs: dict) -> Optional[tuple]:
+    """
+    参数全部为基本标量类型时，直接返回元组作为缓存键，跳过JSON编码和哈希
+
+    键中包含各参数的类型，使 1、1.0 和 True 互不冲突；元组键与字符串键不会相互冲突。
+
+    Args:
+        func_name: 函数名
+        args: 位置参数
+        kwargs: 关键字参数
+
+    Returns:
+        元组缓存键；存在其他类型的参数时返回 None
+    """
+    arg_types = tuple(type(arg) for arg in args)
+    if not _FAST_KEY_TYPES.issuperset(arg_types):
+        return None
+    if not kwargs:
+        return (CACHE_VERSION, func_name, args, arg_types)
+
+    items = tuple(sorted(kwargs.items()))
+    kwarg_types = tuple(type(v) for _, v in items)
+    if not _FAST_KEY_TYPES.issuperset(kwarg_types):
+        return None
+    return (CACHE_VERSION, func_name, args, arg_types, items, kwarg_types)
+
+
+def _update_key_part(hasher: Any, part: str) -> None:
+    """向哈希对象写入一段键内容及分隔符"""
+    hasher.update(part.encode())
+    hasher.update(b"|")
+
+
+_JSON_SCALAR_TYPES = (str, int, float, bool, type(None))
+_JSON_CONTAINER_TYPES = (list, tuple, dict)
+
+
+def _fast_serialize(obj: Any, ensure_ascii: bool = False) -> Optional[str]:
+    """
+    按类型分派序列化对象，只做一次JSON编码
+
+    Args:
+        obj: 待序列化对象
+        ensure_ascii: 是否转义非ASCII字符
+
+    Returns:
+        JSON字符串；不可序列化时返回 None
+    """
+    if isinstance(obj, _JSON_SCALAR_TYPES):
+        return json.dumps(obj, ensure_ascii=ensure_ascii)
+    if isinstance(obj, _JSON_CONTAINER_TYPES):
+        try:
+            return json.dumps(obj, sort_keys=True, ensure_ascii=ensure_ascii)
+        except (TypeError, ValueError):
+            return None
+    return None
 
 
 # ==================== 缓存装饰器 ====================
@@ -152,20 +415,12 @@ def cached(
             if key_func:
                 cache_key = key_func(func.__name__, args, kwargs)
             else:
-                cache_key = generate_cache_key(func.__name__, args, kwargs)
-
-            # 尝试从缓存获取
-            cached_value = cache.get(cache_key)
-            if cached_value is not None:
-                return cached_value
+                cache_key = _fast_cache_key(func.__name__, args, kwargs)
+                if cache_key is None:
+                    cache_key = generate_cache_key(func.__name__, args, kwargs)
 
-            # 执行函数
-            result = func(*args, **kwargs)
-
-            # 存入缓存
-            cache.set(cache_key, result, ttl)
-
-            return result
+            # 从缓存获取，未命中时执行函数并存入缓存（并发未命中只执行一次）
+            return cache.get_or_compute(cache_key, lambda: func(*args, **kwargs), ttl)
 
         # 添加缓存相关方法
         wrapper.cache_clear = lambda: cache.clear()
@@ -191,7 +446,7 @@ def cached_llm(ttl: int = 3600) -> Callable:
         def call_llm(prompt, model="gpt-3.5"):
             return response
     """
-    return cached(ttl=ttl, cache_instance=_global_cache)
+    return cached(ttl=ttl, cache_instance=_get_llm_cache())
 
 
 def cached_llm_with_key(key_func: Callable) -> Callable:
@@ -212,7 +467,7 @@ def cached_llm_with_key(key_func: Callable) -> Callable:
         def call_llm(prompt, model):
             return response
     """
-    return cached(key_func=key_func, cache_instance=_global_cache)
+    return cached(key_func=key_func, cache_instance=_get_llm_cache())
 
 
 # ==================== 条件缓存装饰器 ====================
@@ -245,18 +500,8 @@ def cached_if(condition: Callable[[...], bool], ttl: int = DEFAULT_CACHE_TTL) ->
             # 生成缓存键
             cache_key = generate_cache_key(func.__name__, args, kwargs)
 
-            # 尝试从缓存获取
-            cached_value = cache.get(cache_key)
-            if cached_value is not None:
-                return cached_value
-
-            # 执行函数
-            result = func(*args, **kwargs)
-
-            # 存入缓存
-            cache.set(cache_key, result, ttl)
-
-            return result
+            # 从缓存获取，未命中时执行函数并存入缓存（并发未命中只执行一次）
+            return cache.get_or_compute(cache_key, lambda: func(*args, **kwargs), ttl)
 
         return wrapper
 
@@ -266,13 +511,30 @@ def cached_if(condition: Callable[[...], bool], ttl: int = DEFAULT_CACHE_TTL) ->
 # ==================== 缓存管理 ====================
 
 def clear_cache() -> None:
-    """清空全局缓存"""
+    """清空全局缓存（包括LLM结果缓存）"""
     _global_cache.clear()
+    if _llm_cache is not None and _llm_cache is not _global_cache:
+        _llm_cache.clear()
 
 
 def get_cache_stats() -> Dict[str, int]:
-    """获取缓存统计信息"""
-    return _global_cache.get_stats()
+    """
+    获取缓存统计信息
+
+    使用独立的LLM结果缓存时，合并其L1统计；disk_size 为L2磁盘缓存项数。
+    """
+    stats = _global_cache.get_stats()
+    llm_cache = _llm_cache
+    if llm_cache is None or llm_cache is _global_cache:
+        return stats
+
+    llm_stats = llm_cache.get_stats()
+    merged = {key: stats[key] + llm_stats[key] for key in ('hits', 'misses', 'sets', 'size')}
+    total = merged['hits'] + merged['misses']
+    merged['hit_rate'] = merged['hits'] / total if total > 0 else 0
+    if 'disk_size' in llm_stats:
+        merged['disk_size'] = llm_stats['disk_size']
+    return merged
 
 
 def display_cache_stats() -> str:
@@ -280,13 +542,16 @@ def display_cache_stats() -> str:
     stats = get_cache_stats()
     total = stats['hits'] + stats['misses']
 
-    return (
+    text = (
         f"缓存统计:\n"
         f"  命中: {stats['hits']}\n"
         f"  未命中: {stats['misses']}\n"
         f"  命中率: {stats['hit_rate']:.1%}\n"
         f"  缓存项: {stats['size']}"
     )
+    if 'disk_size' in stats:
+        text += f"\n  磁盘缓存项: {stats['disk_size']}"
+    return text
 
 
 # ==================== Streamlit 集成 ====================
@@ -308,6 +573,9 @@ def show_cache_stats():
     with col4:
         st.metric("缓存项", stats['size'])
 
+    if 'disk_size' in stats:
+        st.caption(f"💾 磁盘缓存项: {stats['disk_size']}")
+
     # 清除按钮
     if st.button("🗑️ 清空缓存"):
         clear_cache()
@@ -322,24 +590,19 @@ def make_hash_key(*args, **kwargs) -> str:
     从参数创建哈希键
 
     Returns:
-        MD5哈希字符串
+        BLAKE2b哈希字符串
     """
-    key_parts = []
+    hasher = hashlib.blake2b(digest_size=16)
 
     for arg in args:
-        if _is_json_serializable(arg):
-            key_parts.append(json.dumps(arg, sort_keys=True))
-        else:
-            key_parts.append(str(arg))
+        serialized = _fast_serialize(arg, ensure_ascii=True)
+        _update_key_part(hasher, str(arg) if serialized is None else serialized)
 
     for k, v in sorted(kwargs.items()):
-        if _is_json_serializable(v):
-            key_parts.append(f"{k}:{json.dumps(v, sort_keys=True)}")
-        else:
-            key_parts.append(f"{k}:{str(v)}")
+        serialized = _fast_serialize(v, ensure_ascii=True)
+        _update_key_part(hasher, f"{k}:{str(v) if serialized is None else serialized}")
 
-    key_string = "|".join(key_parts)
-    return hashlib.md5(key_string.encode()).hexdigest()
+    return hasher.hexdigest()
 
 
 # ==================== 批量操作缓存 ====================
@@ -361,20 +624,9 @@ def batch_cached(ttl: int = DEFAULT_CACHE_TTL) -> Callable:
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # 尝试从缓存获取
+            # 从缓存获取，未命中时执行函数并存入缓存（并发未命中只执行一次）
             cache_key = generate_cache_key(func.__name__, args, kwargs)
-            cached_value = cache.get(cache_key)
-
-            if cached_value is not None:
-                return cached_value
-
-            # 执行函数
-            result = func(*args, **kwargs)
-
-            # 存入缓存
-            cache.set(cache_key, result, ttl)
-
-            return result
+            return cache.get_or_compute(cache_key, lambda: func(*args, **kwargs), ttl)
 
         return wrapper
 
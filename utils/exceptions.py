@@ -4,11 +4,19 @@ QualInsight 统一异常处理系统
 提供自定义异常类和错误处理工具函数
 """
 
+import logging
 import streamlit as st
 import traceback
 from typing import Optional, Callable
 from functools import wraps
 
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:
+    get_script_run_ctx = None
+
+logger = logging.getLogger(__name__)
+
 
 # ==================== 自定义异常类 ====================
 
@@ -17,6 +25,7 @@ class QualInsightError(Exception):
     def __init__(self, message: str, user_message: Optional[str] = None):
         self.message = message
         self.user_message = user_message or message
+        self.suggestion = _SUGGESTIONS.get(type(self), "")
         super().__init__(self.message)
 
 
@@ -81,6 +90,28 @@ class FileOperationError(QualInsightError):
         super().__init__(message, user_msg)
 
 
+# 自定义异常类型对应的处理建议（在异常构造时读取）
+_SUGGESTIONS = {
+    LLMError: "请检查：①API密钥是否正确 ②网络连接是否正常 ③服务商配额是否充足",
+    DataValidationError: "请检查输入数据格式是否正确，确保所有必填字段都已填写",
+    DataPersistenceError: "建议手动保存当前数据，避免数据丢失",
+    ConfigurationError: "请检查侧边栏配置设置，确保所有参数填写正确",
+    ProcessingError: "尝试刷新页面或重新执行该操作",
+    NetworkError: "请检查网络连接，或稍后重试",
+    FileOperationError: "请检查文件路径是否正确，确保有读写权限",
+}
+
+_NETWORK_SUGGESTION = "请检查网络连接，或稍后重试"
+
+# 未知异常的通用建议规则：(异常类型, 建议)
+_GENERIC_RULES = (
+    ((ConnectionError, TimeoutError), _NETWORK_SUGGESTION),
+    ((KeyError, IndexError), "数据格式可能存在问题，请重新输入"),
+    ((ValueError,), "输入值可能不正确，请检查并重新输入"),
+    ((PermissionError,), "请检查文件或目录的访问权限"),
+)
+
+
 # ==================== 错误处理工具函数 ====================
 
 def handle_error(
@@ -99,7 +130,7 @@ def handle_error(
     # 如果是自定义异常，使用用户友好的消息
     if isinstance(error, QualInsightError):
         user_message = error.user_message
-        suggestion = _get_error_suggestion(error)
+        suggestion = error.suggestion
     else:
         # 对于未知异常，提供通用消息
         user_message = f"操作失败: {str(error)}"
@@ -110,50 +141,67 @@ def handle_error(
     if context:
         error_msg = f"❌ [{context}] {user_message}"
 
+    # 没有 Streamlit 运行上下文（测试、命令行批处理）时改为写日志
+    if not _in_streamlit_run():
+        logger.error(
+            "%s%s", error_msg, f" 💡 {suggestion}" if suggestion else "",
+            exc_info=error if show_details else None
+        )
+        return
+
     st.error(error_msg)
 
     # 显示建议
     if suggestion:
         st.caption(f"💡 {suggestion}")
 
-    # 在开发模式下显示详细信息
+    # 在开发模式下显示详细信息（堆栈仅在需要展示时格式化）
     if show_details or st.session_state.get('debug_mode', False):
         with st.expander("🔧 技术详情（开发模式）"):
             st.code(f"异常类型: {type(error).__name__}\n"
                    f"错误消息: {str(error)}\n\n"
-                   f"堆栈追踪:\n{''.join(traceback.format_exception(type(error), error, error.__traceback__))}",
+                   f"堆栈追踪:\n{_format_traceback(error)}",
                    language="python")
 
 
-def _get_error_suggestion(error: QualInsightError) -> str:
-    """根据异常类型返回针对性建议"""
-    suggestions = {
-        LLMError: "请检查：①API密钥是否正确 ②网络连接是否正常 ③服务商配额是否充足",
-        DataValidationError: "请检查输入数据格式是否正确，确保所有必填字段都已填写",
-        DataPersistenceError: "建议手动保存当前数据，避免数据丢失",
-        ConfigurationError: "请检查侧边栏配置设置，确保所有参数填写正确",
-        ProcessingError: "尝试刷新页面或重新执行该操作",
-        NetworkError: "请检查网络连接，或稍后重试",
-        FileOperationError: "请检查文件路径是否正确，确保有读写权限",
-    }
-    return suggestions.get(type(error), "")
+def _in_streamlit_run() -> bool:
+    """当前线程是否由 Streamlit 脚本运行驱动"""
+    return get_script_run_ctx is not None and get_script_run_ctx(suppress_warning=True) is not None
+
+
+# 堆栈追踪最多保留的帧数（保留离异常发生处最近的帧）
+TRACEBACK_LIMIT = 20
+
+
+def _format_traceback(error: Exception) -> str:
+    """
+    格式化异常堆栈（不捕获帧局部变量，限制帧数）
+
+    结果缓存在异常对象上，同一异常在 Streamlit 重新运行时再次展示不会重复格式化。
+    """
+    formatted = getattr(error, "_formatted_traceback", None)
+    if formatted is None:
+        tbe = traceback.TracebackException.from_exception(
+            error, limit=-TRACEBACK_LIMIT, capture_locals=False
+        )
+        formatted = "".join(tbe.format())
+        error._formatted_traceback = formatted
+    return formatted
 
 
 def _get_generic_suggestion(error: Exception) -> str:
     """为未知异常返回通用建议"""
-    error_type = type(error).__name__
-
-    # 常见错误的针对性建议
-    if "Connection" in error_type or "Timeout" in error_type:
-        return "请检查网络连接，或稍后重试"
-    elif "KeyError" in error_type or "IndexError" in error_type:
-        return "数据格式可能存在问题，请重新输入"
-    elif "ValueError" in error_type:
-        return "输入值可能不正确，请检查并重新输入"
-    elif "Permission" in error_type:
-        return "请检查文件或目录的访问权限"
-    else:
-        return "如果问题持续，请联系技术支持或刷新页面重试"
+    # 常见错误的针对性建议（按顺序匹配，子类同样适用）
+    for classes, suggestion in _GENERIC_RULES:
+        if isinstance(error, classes):
+            return suggestion
+
+    # 第三方库（如 requests、openai）的网络异常不一定继承内置类型，按类名兜底
+    for cls in type(error).__mro__:
+        if "Connection" in cls.__name__ or "Timeout" in cls.__name__:
+            return _NETWORK_SUGGESTION
+
+    return "如果问题持续，请联系技术支持或刷新页面重试"
 
 
 def safe_execute(
@@ -225,12 +273,8 @@ def catch_errors(
         def wrapper(*args, **kwargs):
             try:
                 return func(*args, **kwargs)
-            except QualInsightError as e:
-                handle_error(e, show_details=show_details, context=context or func.__name__)
-                if reraise:
-                    raise
-                return default_return
             except Exception as e:
+                # handle_error 内部区分自定义异常与未知异常
                 handle_error(e, show_details=show_details, context=context or func.__name__)
                 if reraise:
                     raise
@@ -290,7 +334,7 @@ class ErrorContainer:
             with st.expander(f"问题 {i}: {context}"):
                 if isinstance(error, QualInsightError):
                     st.write(error.user_message)
-                    st.caption(_get_error_suggestion(error))
+                    st.caption(error.suggestion)
                 else:
                     st.write(str(error))
                     st.caption(_get_generic_suggestion(error))
@@ -366,7 +410,16 @@ def is_api_key_valid(api_key: str) -> bool:
     if len(api_key) < 20:
         return False
 
-    has_letter = any(c.isalpha() for c in api_key)
-    has_digit = any(c.isdigit() for c in api_key)
-
-    return has_letter and has_digit
+    # 单次遍历，字母和数字都出现后立即返回
+    has_letter = has_digit = False
+    for c in api_key:
+        if c.isdigit():
+            has_digit = True
+        elif c.isalpha():
+            has_letter = True
+        else:
+            continue
+        if has_letter and has_digit:
+            return True
+
+    return False
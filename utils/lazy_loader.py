@@ -9,6 +9,10 @@ from typing import Callable, Any, Optional, Dict
 import threading
 
 
+# 尚未加载的标记（与加载结果为 None 的情况区分）
+_UNSET = object()
+
+
 # ==================== 懒加载类 ====================
 
 class LazyLoader:
@@ -31,34 +35,31 @@ class LazyLoader:
         """
         self._load_func = load_func
         self._name = name or load_func.__name__
-        self._instance = None
-        self._loaded = False
+        self._instance = _UNSET
         self._lock = threading.Lock()
 
     def __call__(self) -> Any:
         """获取加载的资源"""
-        if self._loaded:
-            return self._instance
+        instance = self._instance
+        if instance is not _UNSET:
+            return instance
 
         with self._lock:
             # 双重检查锁定模式
-            if self._loaded:
-                return self._instance
-
-            self._instance = self._load_func()
-            self._loaded = True
+            instance = self._instance
+            if instance is _UNSET:
+                instance = self._instance = self._load_func()
 
-        return self._instance
+        return instance
 
     def is_loaded(self) -> bool:
         """检查是否已加载"""
-        return self._loaded
+        return self._instance is not _UNSET
 
     def reset(self):
         """重置（卸载资源）"""
         with self._lock:
-            self._instance = None
-            self._loaded = False
+            self._instance = _UNSET
 
     def preload(self):
         """预加载资源"""
@@ -86,23 +87,24 @@ class LazyDict:
         """
         self._load_funcs = load_dict
         self._instances = {}
-        self._locks = {key: threading.Lock() for key in load_dict}
+        self._lock = threading.Lock()
 
     def __getitem__(self, key: str) -> Any:
         """获取并加载指定键的值"""
-        if key in self._instances:
-            return self._instances[key]
+        instance = self._instances.get(key, _UNSET)
+        if instance is not _UNSET:
+            return instance
 
-        if key not in self._load_funcs:
+        load_func = self._load_funcs.get(key)
+        if load_func is None:
             raise KeyError(f"Key '{key}' not found")
 
-        with self._locks[key]:
-            if key in self._instances:
-                return self._instances[key]
-
-            self._instances[key] = self._load_funcs[key]()
+        with self._lock:
+            instance = self._instances.get(key, _UNSET)
+            if instance is _UNSET:
+                instance = self._instances[key] = load_func()
 
-        return self._instances[key]
+        return instance
 
     def get(self, key: str, default: Any = None) -> Any:
         """安全获取值"""
@@ -166,6 +168,9 @@ def cached_property(load_func: Optional[Callable] = None):
     """
     缓存属性装饰器 - 首次访问后缓存结果
 
+    基于 functools.cached_property：结果直接存入实例 __dict__，
+    之后的访问不再经过描述符。删除属性即可重置（del obj.expensive_resource）。
+
     Example:
         class MyClass:
             @cached_property
@@ -176,37 +181,40 @@ def cached_property(load_func: Optional[Callable] = None):
         resource = obj.expensive_resource  # 首次加载
         resource = obj.expensive_resource  # 使用缓存
     """
-    attr_name = f"_cached_{load_func.__name__ if load_func else 'property'}"
-
-    def decorator(func: Callable) -> Callable:
-        @functools.wraps(func)
-        def wrapper(self):
-            if not hasattr(self, attr_name):
-                setattr(self, attr_name, func(self))
-            return getattr(self, attr_name)
-
-        # 添加重置方法
-        def reset(self):
-            if hasattr(self, attr_name):
-                delattr(self, attr_name)
-
-        wrapper.reset = reset
-
-        return property(wrapper)
-
     if load_func is not None:
-        return decorator(load_func)
+        return functools.cached_property(load_func)
 
-    return decorator
+    return functools.cached_property
 
 
 # ==================== 全局懒加载实例 ====================
 
-# NLP模型懒加载器
-_nlp_models = LazyDict({
+# NLP模型加载函数
+_NLP_MODEL_LOADERS = {
     "spacy_zh": lambda: __import__("spacy").load("zh_core_web_sm"),
     "spacy_en": lambda: __import__("spacy").load("en_core_web_sm"),
-})
+}
+
+
+# 已加载的模型：命中时无锁读取，首次加载在锁内双重检查，
+# 保证多个会话同时请求时模型只加载一次
+_nlp_models: Dict[str, Any] = {}
+_nlp_models_lock = threading.Lock()
+
+
+def _load_nlp_model(model_name: str):
+    """加载并缓存NLP模型（每个模型只加载一次）"""
+    model = _nlp_models.get(model_name, _UNSET)
+    if model is _UNSET:
+        with _nlp_models_lock:
+            model = _nlp_models.get(model_name, _UNSET)
+            if model is _UNSET:
+                load_func = _NLP_MODEL_LOADERS.get(model_name)
+                if load_func is None:
+                    raise KeyError(f"Key '{model_name}' not found")
+                model = load_func()
+                _nlp_models[model_name] = model
+    return model
 
 
 def get_nlp_model(model_name: str = "spacy_zh"):
@@ -219,12 +227,18 @@ def get_nlp_model(model_name: str = "spacy_zh"):
     Returns:
         加载的模型
     """
-    return _nlp_models[model_name]
+    return _load_nlp_model(model_name)
 
 
 def preload_nlp_model(model_name: str = "spacy_zh"):
     """预加载NLP模型"""
-    _nlp_models.preload(model_name)
+    _load_nlp_model(model_name)
+
+
+def reset_nlp_models():
+    """释放已加载的NLP模型，下次获取时重新加载"""
+    with _nlp_models_lock:
+        _nlp_models.clear()
 
 
 # ==================== 上下文管理器 ====================
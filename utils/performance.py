@@ -6,58 +6,107 @@ QualInsight 性能监控和追踪模块
 
 import time
 import functools
-from typing import Callable, Dict, List, Optional
-from collections import defaultdict
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 import streamlit as st
 
 
 # ==================== 性能追踪器 ====================
 
 class PerformanceTracker:
-    """性能追踪器"""
+    """性能追踪器（每个名称只保存累计值：次数、总耗时、最小、最大，耗时以纳秒整数记录）"""
 
     def __init__(self):
-        self._metrics: Dict[str, List[float]] = defaultdict(list)
-        self._call_counts: Dict[str, int] = defaultdict(int)
+        self._agg: Dict[str, List[int]] = {}  # name: [count, total_ns, min_ns, max_ns]
+        self._sorted_stats: Optional[List[Tuple[str, Dict[str, float]]]] = None  # 排序统计快照，写入时失效
 
-    def track(self, name: str, duration: float):
-        """记录性能数据"""
-        self._metrics[name].append(duration)
-        self._call_counts[name] += 1
+    def track(self, name: str, duration: int):
+        """
+        记录性能数据
+
+        Args:
+            name: 追踪名称
+            duration: 耗时（纳秒）
+        """
+        self._sorted_stats = None
+        agg = self._agg.get(name)
+        if agg is None:
+            self._agg[name] = [1, duration, duration, duration]
+            return
+
+        agg[0] += 1
+        agg[1] += duration
+        if duration < agg[2]:
+            agg[2] = duration
+        if duration > agg[3]:
+            agg[3] = duration
 
     def get_stats(self, name: str) -> Dict[str, float]:
-        """获取指定名称的统计"""
-        if name not in self._metrics:
+        """获取指定名称的统计（耗时单位：秒）"""
+        agg = self._agg.get(name)
+        if agg is None:
             return {}
 
-        durations = self._metrics[name]
+        count, total, min_duration, max_duration = agg
 
         return {
-            'count': len(durations),
-            'total': sum(durations),
-            'avg': sum(durations) / len(durations),
-            'min': min(durations),
-            'max': max(durations),
+            'count': count,
+            'total': total / 1e9,
+            'avg': total / count / 1e9,
+            'min': min_duration / 1e9,
+            'max': max_duration / 1e9,
         }
 
     def get_all_stats(self) -> Dict[str, Dict[str, float]]:
         """获取所有统计"""
-        return {name: self.get_stats(name) for name in self._metrics}
+        return {name: self.get_stats(name) for name in self._agg}
+
+    def get_sorted_stats(self) -> List[Tuple[str, Dict[str, float]]]:
+        """获取按总耗时降序排列的统计（无新数据时复用上次结果）"""
+        if self._sorted_stats is None:
+            self._sorted_stats = sorted(
+                self.get_all_stats().items(),
+                key=lambda x: x[1]['total'],
+                reverse=True
+            )
+        return self._sorted_stats
 
     def reset(self):
         """重置所有数据"""
-        self._metrics.clear()
-        self._call_counts.clear()
+        self._agg.clear()
+        self._sorted_stats = None
 
 
 # ==================== 性能装饰器 ====================
 
 _global_tracker = PerformanceTracker()
 
+# 是否启用性能追踪（默认启用；disable_tracking() 后被装饰函数直接调用原函数）
+_ENABLED = True
+
+
+def enable_tracking():
+    """启用性能追踪"""
+    global _ENABLED
+    _ENABLED = True
+
+
+def disable_tracking():
+    """关闭性能追踪"""
+    global _ENABLED
+    _ENABLED = False
+
+
+def is_tracking_enabled() -> bool:
+    """是否已启用性能追踪"""
+    return _ENABLED
+
 
 def track_performance(name: Optional[str] = None):
     """
-    性能追踪装饰器
+    性能追踪装饰器（disable_tracking() 之后不再记录）
 
     Args:
         name: 追踪名称（默认使用函数名）
@@ -70,13 +119,13 @@ def track_performance(name: Optional[str] = None):
 
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            start = time.time()
+            if not _ENABLED:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
             try:
-                result = func(*args, **kwargs)
-                return result
+                return func(*args, **kwargs)
             finally:
-                duration = time.time() - start
-                _global_tracker.track(tracker_name, duration)
+                _global_tracker.track(tracker_name, time.perf_counter_ns() - start)
 
         return wrapper
 
@@ -85,18 +134,52 @@ def track_performance(name: Optional[str] = None):
 
 def track_if_debug(func: Callable) -> Callable:
     """仅在调试模式下追踪性能"""
+    tracker_name = func.__name__
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        if st.session_state.get('debug_mode', False):
-            return track_performance()(func)(*args, **kwargs)
-        else:
+        if not st.session_state.get('debug_mode', False):
             return func(*args, **kwargs)
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _global_tracker.track(tracker_name, time.perf_counter_ns() - start)
 
     return wrapper
 
 
 # ==================== 批量处理优化 ====================
 
+class _ProgressReporter:
+    """
+    节流的进度显示
+
+    复用同一个进度条和状态占位符，仅在整数百分比变化时刷新，
+    使前端更新次数最多约为100次；完成提示也写入同一占位符。
+    """
+
+    def __init__(self, total: int):
+        """
+        Args:
+            total: 项目总数
+        """
+        self.total = total
+        self.progress_bar = st.progress(0.0)
+        self.status = st.empty()
+        self._last_pct = -1
+
+    def update(self, done: int) -> None:
+        """更新已处理数量"""
+        total = self.total
+        pct = 100 * done // total if total else 100
+        if pct == self._last_pct:
+            return
+        self._last_pct = pct
+        self.progress_bar.progress(done / total if total else 1.0)
+        self.status.caption(f"处理中: {done}/{total}")
+
+
 class BatchProcessor:
     """批量处理器"""
 
@@ -129,24 +212,22 @@ class BatchProcessor:
         results = []
         total = len(items)
         batches = (total + self.batch_size - 1) // self.batch_size
+        progress = _ProgressReporter(total) if show_progress else None
 
         for i in range(batches):
             start_idx = i * self.batch_size
             end_idx = min((i + 1) * self.batch_size, total)
             batch = items[start_idx:end_idx]
 
-            if show_progress:
-                progress = (end_idx / total)
-                st.progress(progress)
-                st.caption(f"处理中: {end_idx}/{total}")
+            if progress:
+                progress.update(end_idx)
 
             # 处理批次
             batch_results = [process_func(item) for item in batch]
             results.extend(batch_results)
 
-        if show_progress:
-            st.progress(1.0)
-            st.success(f"✅ 处理完成: {total} 项")
+        if progress:
+            progress.status.success(f"✅ 处理完成: {total} 项")
 
         return results
 
@@ -171,11 +252,11 @@ class BatchProcessor:
         """
         results = []
         failed_items = []
+        progress = _ProgressReporter(len(items)) if show_progress else None
 
         for i, item in enumerate(items):
-            if show_progress:
-                st.progress((i + 1) / len(items))
-                st.caption(f"处理中: {i + 1}/{len(items)}")
+            if progress:
+                progress.update(i + 1)
 
             # 带重试的处理
             for attempt in range(max_retries):
@@ -189,13 +270,11 @@ class BatchProcessor:
                     else:
                         time.sleep(1)  # 等待后重试
 
-        if show_progress:
-            st.progress(1.0)
-
+        if progress:
             if failed_items:
-                st.warning(f"⚠️ {len(failed_items)} 项处理失败")
+                progress.status.warning(f"⚠️ {len(failed_items)} 项处理失败")
             else:
-                st.success(f"✅ 处理完成: {len(results)} 项")
+                progress.status.success(f"✅ 处理完成: {len(results)} 项")
 
         return results
 
@@ -203,7 +282,7 @@ class BatchProcessor:
 # ==================== 并发处理 ====================
 
 class ConcurrentProcessor:
-    """并发处理器（简化版）"""
+    """并发处理器（基于线程池，适用于LLM调用等I/O密集型任务）"""
 
     def __init__(self, max_workers: int = 5):
         """
@@ -231,15 +310,25 @@ class ConcurrentProcessor:
         Returns:
             处理结果列表
         """
-        # 简化实现：顺序处理（实际应用可使用线程池）
-        results = []
+        results = [None] * len(items)
+        if not items:
+            return results
 
-        for i, item in enumerate(items):
-            if show_progress:
-                st.progress((i + 1) / len(items))
+        progress = _ProgressReporter(len(items)) if show_progress else None
 
-            result = process_func(item)
-            results.append(result)
+        # 工作线程只执行 process_func，进度更新留在当前（Streamlit）线程
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(process_func, item): i for i, item in enumerate(items)}
+
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    results[futures[future]] = future.result()
+                    if progress:
+                        progress.update(done)
+            except BaseException:
+                # 出错时取消排队中的任务，避免退出 with 块时仍逐个执行（如付费的LLM调用）
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
 
         return results
 
@@ -248,21 +337,15 @@ class ConcurrentProcessor:
 
 def show_performance_report():
     """显示性能报告"""
-    stats = _global_tracker.get_all_stats()
+    # 按总耗时排序
+    sorted_stats = _global_tracker.get_sorted_stats()
 
-    if not stats:
+    if not sorted_stats:
         st.info("📊 暂无性能数据")
         return
 
     st.write("### 📊 性能报告")
 
-    # 按总耗时排序
-    sorted_stats = sorted(
-        stats.items(),
-        key=lambda x: x[1].get('total', 0),
-        reverse=True
-    )
-
     for name, stat in sorted_stats:
         with st.expander(f"🔍 {name}"):
             col1, col2, col3, col4 = st.columns(4)
@@ -288,13 +371,13 @@ def show_performance_report():
 
 def show_performance_summary():
     """显示性能摘要"""
-    stats = _global_tracker.get_all_stats()
+    sorted_stats = _global_tracker.get_sorted_stats()
 
-    if not stats:
+    if not sorted_stats:
         return
 
-    total_calls = sum(s.get('count', 0) for s in stats.values())
-    total_time = sum(s.get('total', 0) for s in stats.values())
+    total_calls = sum(s.get('count', 0) for _, s in sorted_stats)
+    total_time = sum(s.get('total', 0) for _, s in sorted_stats)
 
     col1, col2, col3 = st.columns(3)
 
@@ -340,18 +423,30 @@ class ResponsiveLayout:
             for item in items:
                 st.write(item)
         else:
-            # 多列布局
+            # 多列布局：先按列分组，每列只进入一次容器
             columns = min(max_columns, len(items))
             cols = st.columns([1] * columns)
 
-            for i, item in enumerate(items):
-                col = cols[i % columns]
+            for i, col in enumerate(cols):
                 with col:
-                    st.write(item)
+                    for item in items[i::columns]:
+                        st.write(item)
 
 
 # ==================== 操作历史和撤销 ====================
 
+@dataclass
+class Action:
+    """操作历史记录项"""
+    __slots__ = ('type', 'description', 'data', 'restore_func', 'timestamp')
+
+    type: str
+    description: str
+    data: Any
+    restore_func: Optional[Callable]
+    timestamp: float
+
+
 class ActionHistory:
     """操作历史管理器"""
 
@@ -362,7 +457,7 @@ class ActionHistory:
         Args:
             max_history: 最大历史记录数
         """
-        self.history: List[Dict[str, Any]] = []
+        self.history: deque = deque(maxlen=max_history)  # 超出上限时自动丢弃最早的记录
         self.max_history = max_history
         self.current_index = -1
 
@@ -382,24 +477,22 @@ class ActionHistory:
             data: 数据
             restore_func: 恢复函数
         """
-        action = {
-            'type': action_type,
-            'description': description,
-            'data': data,
-            'restore_func': restore_func,
-            'timestamp': time.time(),
-        }
+        action = Action(
+            type=action_type,
+            description=description,
+            data=data,
+            restore_func=restore_func,
+            timestamp=time.time(),
+        )
 
         # 如果当前不在历史末尾，移除后面的记录
-        if self.current_index < len(self.history) - 1:
-            self.history = self.history[:self.current_index + 1]
+        while len(self.history) - 1 > self.current_index:
+            self.history.pop()
 
+        # 历史已满时追加会挤掉最早的记录，当前位置仍是末尾
+        was_full = len(self.history) == self.max_history
         self.history.append(action)
-
-        # 限制历史长度
-        if len(self.history) > self.max_history:
-            self.history.pop(0)
-        else:
+        if not was_full:
             self.current_index += 1
 
     def can_undo(self) -> bool:
@@ -410,7 +503,7 @@ class ActionHistory:
         """是否可以重做"""
         return self.current_index < len(self.history) - 1
 
-    def undo(self) -> Optional[Dict[str, Any]]:
+    def undo(self) -> Optional[Action]:
         """撤销"""
         if not self.can_undo():
             return None
@@ -420,7 +513,7 @@ class ActionHistory:
 
         return action
 
-    def redo(self) -> Optional[Dict[str, Any]]:
+    def redo(self) -> Optional[Action]:
         """重做"""
         if not self.can_redo():
             return None
@@ -430,9 +523,13 @@ class ActionHistory:
 
         return action
 
-    def get_history(self) -> List[Dict[str, Any]]:
-        """获取历史记录"""
-        return self.history.copy()
+    def get_history(self) -> List[Action]:
+        """获取历史记录快照（复制一份，调用方可自由修改）"""
+        return list(self.history)
+
+    def iter_history(self) -> Iterator[Action]:
+        """遍历历史记录（不复制；遍历期间不要添加操作）"""
+        return iter(self.history)
 
 
 # ==================== 全局实例 ====================
@@ -459,11 +556,11 @@ def show_undo_redo():
     with col1:
         if st.button("↩️ 撤销", disabled=not history.can_undo()):
             action = history.undo()
-            if action and action.get('restore_func'):
-                action['restore_func'](action['data'])
+            if action and action.restore_func:
+                action.restore_func(action.data)
 
     with col2:
         if st.button("↪️ 重做", disabled=not history.can_redo()):
             action = history.redo()
-            if action and action.get('restore_func'):
-                action['restore_func'](action['data'])
+            if action and action.restore_func:
+                action.restore_func(action.data)
@@ -8,6 +8,44 @@ import time
 import functools
 from typing import Callable, List, Tuple, Any, Optional, Generator
 from contextlib import contextmanager
+import streamlit as st
+
+
+# ==================== 刷新节流 ====================
+
+DEFAULT_MIN_INTERVAL = 0.1  # 两次刷新的最小时间间隔（秒）
+DEFAULT_MIN_DELTA = 0.005  # 触发刷新的最小进度变化
+
+
+class _RenderThrottle:
+    """进度刷新节流器：时间间隔或进度变化足够大、或到达最后一步时才刷新界面"""
+
+    def __init__(self, min_interval: float = DEFAULT_MIN_INTERVAL, min_delta: float = DEFAULT_MIN_DELTA):
+        self.min_interval = min_interval
+        self.min_delta = min_delta
+        self._last_render = None
+        self._last_progress = 0.0
+
+    def should_render(self, progress: float, final: bool = False) -> bool:
+        """判断本次更新是否需要刷新界面，需要时记录刷新时间和进度"""
+        now = time.monotonic()
+        if not (
+            final
+            or self._last_render is None
+            or now - self._last_render >= self.min_interval
+            or abs(progress - self._last_progress) >= self.min_delta
+        ):
+            return False
+
+        self._last_render = now
+        self._last_progress = progress
+        return True
+
+
+def _step_fractions(steps: List[str]) -> Tuple[float, ...]:
+    """预先计算每一步完成后的进度（第 i 步对应 (i+1)/n）"""
+    n = len(steps)
+    return tuple((i + 1) / n for i in range(n)) if n else (1.0,)
 
 
 # ==================== 进度管理器 ====================
@@ -15,24 +53,35 @@ from contextlib import contextmanager
 class ProgressManager:
     """进度管理器 - 跟踪多步骤操作的进度"""
 
-    def __init__(self, steps: List[str], container=None):
+    def __init__(
+        self,
+        steps: List[str],
+        container=None,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        min_delta: float = DEFAULT_MIN_DELTA
+    ):
         """
         初始化进度管理器
 
         Args:
             steps: 步骤名称列表
             container: Streamlit 容器（用于显示进度）
+            min_interval: 两次界面刷新的最小时间间隔（秒）
+            min_delta: 触发界面刷新的最小进度变化
         """
         self.steps = steps
+        self._n = len(steps)
+        self._fractions = _step_fractions(steps)
         self.current_step = 0
         self.container = container
         self._start_time = None
         self._status_text = None
         self._progress_bar = None
+        self._throttle = _RenderThrottle(min_interval, min_delta)
 
     def start(self):
         """开始进度跟踪"""
-        self._start_time = time.time()
+        self._start_time = time.monotonic()
         self.current_step = 0
 
         if self.container:
@@ -50,20 +99,23 @@ class ProgressManager:
         """
         self.current_step = step_index
 
+        progress = self._fractions[step_index] if step_index < self._n else 1.0
+        if not self._throttle.should_render(progress, final=step_index >= self._n - 1):
+            return
+
         if self._status_text:
-            status_msg = self.steps[step_index] if step_index < len(self.steps) else message
+            status_msg = self.steps[step_index] if step_index < self._n else message
             if message:
                 status_msg = f"{status_msg}: {message}"
             self._status_text.text(status_msg)
 
         if self._progress_bar:
-            progress = (step_index + 1) / len(self.steps)
             self._progress_bar.progress(progress)
 
     def complete(self, message: str = "完成！"):
         """标记完成"""
         if self._status_text:
-            elapsed = time.time() - self._start_time if self._start_time else 0
+            elapsed = time.monotonic() - self._start_time if self._start_time else 0
             self._status_text.text(f"✅ {message} (耗时: {elapsed:.1f}秒)")
 
         if self._progress_bar:
@@ -97,50 +149,52 @@ def with_progress(steps: List[str], show_time: bool = True):
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            import streamlit as st
-
-            # 创建进度容器
+            # 创建进度容器：状态、进度条和耗时合并在一个占位符中，每次更新只发送一次
             progress_container = st.container()
 
             with progress_container:
                 st.write(f"**执行进度**:")
-                status_text = st.empty()
-                progress_bar = st.progress(0)
-                time_text = st.empty() if show_time else None
+                panel = st.empty()
+
+            start_time = time.monotonic()
+            throttle = _RenderThrottle()
+            last_progress = 0.0
+            n = len(steps)
+            fractions = _step_fractions(steps)
 
-            start_time = time.time()
+            def time_line(label: str) -> Optional[str]:
+                if not show_time:
+                    return None
+                return f"⏱️ {label}: {time.monotonic() - start_time:.1f}秒"
 
             try:
                 # 执行函数（传入回调用于更新进度）
                 def update_progress(step_index: int, message: str = ""):
-                    if step_index < len(steps):
+                    nonlocal last_progress
+                    progress = fractions[step_index] if step_index < n else 1.0
+                    if not throttle.should_render(progress, final=step_index >= n - 1):
+                        return
+
+                    if step_index < n:
                         status_msg = steps[step_index]
                         if message:
                             status_msg = f"{status_msg}: {message}"
                     else:
                         status_msg = message
 
-                    status_text.text(status_msg)
-                    progress_bar.progress((step_index + 1) / len(steps))
-
-                    if show_time and time_text:
-                        elapsed = time.time() - start_time
-                        time_text.caption(f"⏱️ 已耗时: {elapsed:.1f}秒")
+                    last_progress = progress
+                    panel.markdown(_progress_panel(status_msg, progress, time_line("已耗时")))
 
                 # 执行原函数
                 result = func(*args, **kwargs, progress_callback=update_progress)
 
                 # 显示完成状态
-                elapsed = time.time() - start_time
-                status_text.text(f"✅ 完成！")
-                progress_bar.progress(1.0)
-                if show_time and time_text:
-                    time_text.caption(f"⏱️ 总耗时: {elapsed:.1f}秒")
+                panel.markdown(_progress_panel("✅ 完成！", 1.0, time_line("总耗时")))
 
                 return result
 
             except Exception as e:
-                status_text.text(f"❌ 出错: {str(e)}")
+                panel.markdown(_progress_panel(f"❌ 出错: {str(e)}", last_progress, time_line("已耗时")))
                 raise
 
         return wrapper
@@ -148,6 +202,31 @@ def with_progress(steps: List[str], show_time: bool = True):
     return decorator
 
 
+PANEL_BAR_WIDTH = 20  # 文本进度条的格数
+
+
+def _progress_panel(status: str, progress: float, time_text: Optional[str] = None) -> str:
+    """
+    组合状态、文本进度条和耗时为一段 Markdown
+
+    Args:
+        status: 状态消息
+        progress: 进度（0-1）
+        time_text: 耗时说明
+
+    Returns:
+        Markdown 文本
+    """
+    filled = int(progress * PANEL_BAR_WIDTH)
+    lines = [
+        status,
+        f"`{'█' * filled}{'░' * (PANEL_BAR_WIDTH - filled)}` {progress * 100:.0f}%",
+    ]
+    if time_text:
+        lines.append(time_text)
+    return "\n\n".join(lines)
+
+
 def with_spinner(message: str = "处理中..."):
     """
     简单的加载装饰器
@@ -161,8 +240,6 @@ def with_spinner(message: str = "处理中..."):
     def decorator(func: Callable) -> Callable:
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            import streamlit as st
-
             with st.spinner(message):
                 return func(*args, **kwargs)
 
@@ -193,8 +270,6 @@ def progress_context(steps: List[str], container=None):
             # ... 执行步骤2
             progress.complete()
     """
-    import streamlit as st
-
     manager = ProgressManager(steps, container)
 
     if container is None:
@@ -218,16 +293,21 @@ def progress_context(steps: List[str], container=None):
 
 # ==================== 流式进度 ====================
 
-def stream_progress(steps_generator: Generator[Tuple[int, str], None, Any], container=None):
+def stream_progress(
+    steps_generator: Generator[Tuple[int, str], None, Any],
+    total: int,
+    container=None
+):
     """
     流式显示进度
 
     Args:
         steps_generator: 生成 (step_index, message) 的生成器
+        total: 总步骤数
         container: Streamlit 容器
 
     Returns:
-        生成器的最终结果
+        生成器的最终结果（return 的值）
 
     Example:
         def my_process():
@@ -236,24 +316,34 @@ def stream_progress(steps_generator: Generator[Tuple[int, str], None, Any], cont
                 time.sleep(1)
             return "完成"
 
-        result = stream_progress(my_process())
+        result = stream_progress(my_process(), total=3)
     """
-    import streamlit as st
-
     if container is None:
         container = st.container()
 
     with container:
         status_text = st.empty()
-        progress_bar = st.empty()
+        progress_bar = st.progress(0)
+
+    throttle = _RenderThrottle()
+
+    # 手动迭代以取得生成器 return 的值（for 循环会丢弃 StopIteration.value）
+    while True:
+        try:
+            step_index, message = next(steps_generator)
+        except StopIteration as e:
+            result = e.value
+            break
+
+        progress = min(1.0, (step_index + 1) / total) if total > 0 else 1.0
+        if not throttle.should_render(progress, final=step_index >= total - 1):
+            continue
 
-    result = None
-    for step_index, message in steps_generator:
         status_text.text(f"正在执行: {message}")
-        # 创建进度条（需要重新创建来更新）
-        progress_bar.write(f"进度: {step_index + 1} 步")
+        progress_bar.progress(progress)
 
     status_text.text("✅ 完成！")
+    progress_bar.progress(1.0)
     return result
 
 
@@ -274,6 +364,7 @@ class TaskTracker:
         self.current_subtask = 0
         self._start_time = None
         self._container = None
+        self._subtask_slots = []
 
     def add_subtask(self, name: str):
         """添加子任务"""
@@ -281,29 +372,36 @@ class TaskTracker:
 
     def start(self, container=None):
         """开始追踪"""
-        import streamlit as st
-
-        self._start_time = time.time()
+        self._start_time = time.monotonic()
         self._container = container or st.container()
 
         with self._container:
             st.write(f"**📋 {self.task_name}**")
 
-            if self.subtasks:
-                for i, subtask in enumerate(self.subtasks):
-                    st.markdown(f"{'✅' if i < self.current_subtask else '⏳'} {subtask}")
+            # 每个子任务一个占位符，状态变化时只更新对应行
+            self._subtask_slots = [st.empty() for _ in self.subtasks]
+
+        for i in range(len(self._subtask_slots)):
+            self._render_subtask(i)
+
+    def _render_subtask(self, index: int):
+        """渲染单个子任务行"""
+        icon = '✅' if index < self.current_subtask else '⏳'
+        self._subtask_slots[index].markdown(f"{icon} {self.subtasks[index]}")
 
     def update_subtask(self, index: int):
-        """更新当前子任务"""
+        """更新当前子任务（只重绘状态发生变化的行）"""
+        previous = self.current_subtask
         self.current_subtask = index
-        if self._container:
-            self.start()  # 重新渲染
+
+        for i in range(min(previous, index), min(max(previous, index), len(self._subtask_slots))):
+            self._render_subtask(i)
 
     def complete(self):
         """标记完成"""
         if self._container:
             with self._container:
-                elapsed = time.time() - self._start_time if self._start_time else 0
+                elapsed = time.monotonic() - self._start_time if self._start_time else 0
                 st.success(f"✅ {self.task_name} 完成！ (耗时: {elapsed:.1f}秒)")
 
 
@@ -336,7 +434,7 @@ def estimate_remaining(start_time: float, current_step: int, total_steps: int) -
     估算剩余时间
 
     Args:
-        start_time: 开始时间
+        start_time: 开始时间（time.monotonic() 的取值）
         current_step: 当前步骤
         total_steps: 总步骤数
 
@@ -346,7 +444,7 @@ def estimate_remaining(start_time: float, current_step: int, total_steps: int) -
     if current_step == 0:
         return 0
 
-    elapsed = time.time() - start_time
+    elapsed = time.monotonic() - start_time
     time_per_step = elapsed / current_step
     remaining = time_per_step * (total_steps - current_step)
 
@@ -364,33 +462,43 @@ def show_progress_with_eta(steps: List[str], container=None):
     Returns:
         更新函数
     """
-    import streamlit as st
-
     if container is None:
         container = st.container()
 
-    start_time = time.time()
+    start_time = time.monotonic()
+    n = len(steps)
+    fractions = _step_fractions(steps)
 
     with container:
         status_text = st.empty()
         progress_bar = st.progress(0)
         eta_text = st.empty()
 
+    last_eta_str = None
+
     def update(step_index: int, message: str = ""):
-        step_name = steps[step_index] if step_index < len(steps) else message
+        nonlocal last_eta_str
+        step_name = steps[step_index] if step_index < n else message
 
         status_text.text(f"正在执行: {step_name}")
-        progress_bar.progress((step_index + 1) / len(steps))
+        progress_bar.progress(fractions[step_index] if step_index < n else 1.0)
 
         # 计算预计时间
-        remaining = estimate_remaining(start_time, step_index + 1, len(steps))
-        if remaining > 0:
-            eta_text.caption(f"⏱️ 预计剩余: {format_time(remaining)}")
+        remaining = estimate_remaining(start_time, step_index + 1, n)
+        eta_str = f"⏱️ 预计剩余: {format_time(remaining)}" if remaining > 0 else ""
+
+        # 文本与上次相同时不再刷新
+        if eta_str == last_eta_str:
+            return
+        last_eta_str = eta_str
+
+        if eta_str:
+            eta_text.caption(eta_str)
         else:
             eta_text.empty()
 
     def complete():
-        elapsed = time.time() - start_time
+        elapsed = time.monotonic() - start_time
         status_text.text("✅ 完成！")
         progress_bar.progress(1.0)
         eta_text.caption(f"⏱️ 总耗时: {format_time(elapsed)}")
@@ -410,29 +518,39 @@ def create_progress_container(steps: List[str]) -> tuple:
     Returns:
         (update_func, complete_func) 元组
     """
-    import streamlit as st
-
     with st.container():
         st.write("**执行进度**:")
         status = st.empty()
         progress = st.progress(0)
 
-    start_time = time.time()
+    start_time = time.monotonic()
+    throttle = _RenderThrottle()
+    n = len(steps)
+    fractions = _step_fractions(steps)
+    last_caption = None
 
     def update(step: int, msg: str = ""):
-        name = steps[step] if step < len(steps) else msg
+        nonlocal last_caption
+        fraction = fractions[step] if step < n else 1.0
+        if not throttle.should_render(fraction, final=step >= n - 1):
+            return
+
+        name = steps[step] if step < n else msg
         status.text(name)
-        progress.progress((step + 1) / len(steps))
+        progress.progress(fraction)
 
         # 显示耗时
-        elapsed = time.time() - start_time
+        elapsed = time.monotonic() - start_time
         if step > 0:
             avg_time = elapsed / (step + 1)
-            remaining = avg_time * (len(steps) - step - 1)
-            st.caption(f"⏱️ 已耗时: {format_time(elapsed)} | 预计剩余: {format_time(remaining)}")
+            remaining = avg_time * (n - step - 1)
+            caption = f"⏱️ 已耗时: {format_time(elapsed)} | 预计剩余: {format_time(remaining)}"
+            if caption != last_caption:
+                last_caption = caption
+                st.caption(caption)
 
     def complete(final_msg: str = "完成！"):
-        elapsed = time.time() - start_time
+        elapsed = time.monotonic() - start_time
         status.text(f"✅ {final_msg}")
         progress.progress(1.0)
         st.caption(f"⏱️ 总耗时: {format_time(elapsed)}")
@@ -4,15 +4,90 @@ QualInsight 输入验证和清洗模块
 提供全面的数据验证、清洗和 sanitization 功能
 """
 
+import logging
+import os
 import re
+import sys
+import functools
 import html
-from typing import Optional, List, Any, Union
+from typing import Optional, List, Any, Union, Iterable, Iterator, Tuple
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from .exceptions import DataValidationError
 
+logger = logging.getLogger(__name__)
+
+# ==================== 预编译正则 ====================
+
+_RE_CONTROL = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+# 只匹配需要改写的位置（两个以上空白或含制表符），单个空格不产生匹配；
+# 以字面字符开头的模式能让正则引擎走快速搜索
+_RE_SPACES = re.compile(r' [ \t]+|\t[ \t]*')
+_RE_NEWLINES = re.compile(r'\n\n\n+')
+_RE_CHINESE = re.compile(r'[\u4e00-\u9fff]')
+# 脚本/样式块（连同内容，未闭合时删到文本末尾）
+_RE_SCRIPT_STYLE = re.compile(
+    r'<(script|style)\b[^>]*>.*?(?:</\1\s*>|\Z)',
+    re.IGNORECASE | re.DOTALL
+)
+_RE_TAG = re.compile(r'<[^>]+>')
+_RE_WS = re.compile(r'\s+')
+_RE_EMAIL = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# str.translate 删除表：纯ASCII文本走C层快速路径；含非ASCII字符时逐字符查字典反而比正则慢，仍用正则
+_CONTROL_TRANS = dict.fromkeys([*range(0x00, 0x09), 0x0b, 0x0c, *range(0x0e, 0x20), 0x7f])
+_ASCII_WS_TRANS = dict.fromkeys(map(ord, ' \t\n\r\v\f\x1c\x1d\x1e\x1f'))
+
+# 中文弯引号 -> 英文直引号
+_QUOTE_TRANS = str.maketrans({
+    '\u201c': '"', '\u201d': '"',
+    '\u2018': "'", '\u2019': "'",
+})
+
 
 # ==================== 基础验证函数 ====================
 
+def _field_label(field_name: str) -> str:
+    """错误消息中使用的字段名称"""
+    return field_name or '字段'
+
+
+def _required_msg(value: Any, field_name: str = "") -> Optional[str]:
+    """必填检查（不抛异常），失败时返回错误消息，通过时返回 None"""
+    if (
+        value is None
+        or (isinstance(value, str) and not value.strip())
+        or (isinstance(value, (list, dict)) and len(value) == 0)
+    ):
+        return f"{_field_label(field_name)}不能为空"
+    return None
+
+
+def _length_msg(
+    value: str,
+    min_length: int = 0,
+    max_length: Optional[int] = None,
+    field_name: str = ""
+) -> Optional[str]:
+    """长度检查（不抛异常），失败时返回错误消息，通过时返回 None"""
+    length = len(value)
+
+    if length < min_length:
+        return f"{_field_label(field_name)}长度不能少于 {min_length} 个字符（当前：{length}）"
+
+    if max_length and length > max_length:
+        return f"{_field_label(field_name)}长度不能超过 {max_length} 个字符（当前：{length}）"
+
+    return None
+
+
+def _pattern_msg(value: str, pattern: str, field_name: str = "") -> Optional[str]:
+    """正则检查（不抛异常），失败时返回错误消息，通过时返回 None"""
+    if not re.match(pattern, value):
+        return f"{_field_label(field_name)}格式不正确"
+    return None
+
+
 def validate_required(value: Any, field_name: str = "") -> None:
     """
     验证必填字段
@@ -24,23 +99,9 @@ def validate_required(value: Any, field_name: str = "") -> None:
     Raises:
         DataValidationError: 如果值为空
     """
-    if value is None:
-        raise DataValidationError(
-            f"{'字段' if not field_name else field_name}不能为空",
-            field=field_name
-        )
-
-    if isinstance(value, str) and not value.strip():
-        raise DataValidationError(
-            f"{'字段' if not field_name else field_name}不能为空",
-            field=field_name
-        )
-
-    if isinstance(value, (list, dict)) and len(value) == 0:
-        raise DataValidationError(
-            f"{'字段' if not field_name else field_name}不能为空",
-            field=field_name
-        )
+    msg = _required_msg(value, field_name)
+    if msg:
+        raise DataValidationError(msg, field=field_name)
 
 
 def validate_length(
@@ -61,19 +122,9 @@ def validate_length(
     Raises:
         DataValidationError: 如果长度不符合要求
     """
-    length = len(value)
-
-    if length < min_length:
-        raise DataValidationError(
-            f"{'字段' if not field_name else field_name}长度不能少于 {min_length} 个字符（当前：{length}）",
-            field=field_name
-        )
-
-    if max_length and length > max_length:
-        raise DataValidationError(
-            f"{'字段' if not field_name else field_name}长度不能超过 {max_length} 个字符（当前：{length}）",
-            field=field_name
-        )
+    msg = _length_msg(value, min_length, max_length, field_name)
+    if msg:
+        raise DataValidationError(msg, field=field_name)
 
 
 def validate_range(
@@ -119,15 +170,32 @@ def validate_pattern(value: str, pattern: str, field_name: str = "") -> None:
     Raises:
         DataValidationError: 如果不匹配
     """
-    if not re.match(pattern, value):
-        raise DataValidationError(
-            f"{'字段' if not field_name else field_name}格式不正确",
-            field=field_name
-        )
+    msg = _pattern_msg(value, pattern, field_name)
+    if msg:
+        raise DataValidationError(msg, field=field_name)
 
 
 # ==================== 专门的验证函数 ====================
 
+# 字段名称（驻留字符串：非ASCII常量默认不会被驻留，各处共享同一对象）
+FIELD_RESEARCH_QUESTION = sys.intern("研究问题")
+FIELD_TEXT_CONTENT = sys.intern("文本内容")
+FIELD_CODE_NAME = sys.intern("编码名称")
+FIELD_THEME_NAME = sys.intern("主题名称")
+FIELD_API_KEY = sys.intern("API密钥")
+FIELD_EMAIL = sys.intern("电子邮件")
+FIELD_URL = sys.intern("URL")
+
+_QUESTION_WORDS = ("如何", "为什么", "什么", "怎样", "是否", "how", "why", "what", "whether")
+
+
+def _count_chinese_chars(text: str) -> int:
+    """统计中文字符数（只计数，不构建匹配列表）"""
+    if text.isascii():
+        return 0
+    return _RE_CHINESE.subn('', text)[1]
+
+
 def validate_research_question(question: str) -> str:
     """
     验证并清洗研究问题
@@ -145,17 +213,16 @@ def validate_research_question(question: str) -> str:
     question = clean_text(question)
 
     # 验证
-    validate_required(question, "研究问题")
-    validate_length(question, min_length=10, max_length=500, field_name="研究问题")
-
-    # 检查是否包含问号或疑问词
-    question_words = ["如何", "为什么", "什么", "怎样", "是否", "how", "why", "what", "whether"]
-    has_question_mark = "?" in question or "？" in question
-    has_question_word = any(word in question.lower() for word in question_words)
+    validate_required(question, FIELD_RESEARCH_QUESTION)
+    validate_length(question, min_length=10, max_length=500, field_name=FIELD_RESEARCH_QUESTION)
 
-    if not (has_question_mark or has_question_word):
-        # 不强制要求，但给出警告
-        pass
+    # 检查是否包含问号或疑问词（不强制要求，仅在调试日志开启时检查）
+    if logger.isEnabledFor(logging.DEBUG):
+        has_question_mark = "?" in question or "？" in question
+        lowered = question.lower()
+        has_question_word = any(word in lowered for word in _QUESTION_WORDS)
+        if not (has_question_mark or has_question_word):
+            logger.debug("研究问题不包含问号或疑问词: %s", question)
 
     return question
 
@@ -178,17 +245,14 @@ def validate_text_content(text: str, min_length: int = 50) -> str:
     text = clean_text(text)
 
     # 验证
-    validate_required(text, "文本内容")
-    validate_length(text, min_length=min_length, field_name="文本内容")
-
-    # 检查中文字符占比
-    chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', text))
-    total_chars = len(text.strip())
-    if total_chars > 0:
-        chinese_ratio = chinese_chars / total_chars
+    validate_required(text, FIELD_TEXT_CONTENT)
+    validate_length(text, min_length=min_length, field_name=FIELD_TEXT_CONTENT)
+
+    # 检查中文字符占比（允许纯英文，仅在调试日志开启时检查）
+    if logger.isEnabledFor(logging.DEBUG):
+        chinese_ratio = _count_chinese_chars(text) / len(text)
         if chinese_ratio < 0.1:
-            # 至少10%的中文字符（或者允许纯英文）
-            pass
+            logger.debug("文本内容中文字符占比较低: %.1f%%", chinese_ratio * 100)
 
     return text
 
@@ -204,8 +268,8 @@ def validate_code_name(name: str) -> str:
         清洗后的名称
     """
     name = clean_text(name)
-    validate_required(name, "编码名称")
-    validate_length(name, min_length=2, max_length=100, field_name="编码名称")
+    validate_required(name, FIELD_CODE_NAME)
+    validate_length(name, min_length=2, max_length=100, field_name=FIELD_CODE_NAME)
     return name
 
 
@@ -220,8 +284,8 @@ def validate_theme_name(name: str) -> str:
         清洗后的名称
     """
     name = clean_text(name)
-    validate_required(name, "主题名称")
-    validate_length(name, min_length=2, max_length=100, field_name="主题名称")
+    validate_required(name, FIELD_THEME_NAME)
+    validate_length(name, min_length=2, max_length=100, field_name=FIELD_THEME_NAME)
     return name
 
 
@@ -239,7 +303,7 @@ def validate_api_key(api_key: str) -> str:
         DataValidationError: 如果格式不正确
     """
     if not api_key or not api_key.strip():
-        raise DataValidationError("API密钥不能为空", field="API密钥")
+        raise DataValidationError("API密钥不能为空", field=FIELD_API_KEY)
 
     api_key = api_key.strip()
 
@@ -247,17 +311,25 @@ def validate_api_key(api_key: str) -> str:
     if len(api_key) < 20:
         raise DataValidationError(
             f"API密钥长度不足（至少需要20个字符，当前：{len(api_key)}）",
-            field="API密钥"
+            field=FIELD_API_KEY
         )
 
-    # 检查是否包含字母和数字
-    has_letter = any(c.isalpha() for c in api_key)
-    has_digit = any(c.isdigit() for c in api_key)
+    # 检查是否包含字母和数字（单次遍历，两者都出现即停止）
+    has_letter = has_digit = False
+    for c in api_key:
+        if c.isdigit():
+            has_digit = True
+        elif c.isalpha():
+            has_letter = True
+        else:
+            continue
+        if has_letter and has_digit:
+            break
 
     if not (has_letter and has_digit):
         raise DataValidationError(
             "API密钥格式不正确，应包含字母和数字",
-            field="API密钥"
+            field=FIELD_API_KEY
         )
 
     return api_key
@@ -274,10 +346,9 @@ def validate_email(email: str) -> str:
         清洗后的电子邮件
     """
     email = clean_text(email)
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
 
-    if email and not re.match(email_pattern, email):
-        raise DataValidationError("电子邮件格式不正确", field="电子邮件")
+    if email and not _RE_EMAIL.match(email):
+        raise DataValidationError("电子邮件格式不正确", field=FIELD_EMAIL)
 
     return email
 
@@ -295,7 +366,7 @@ def validate_url(url: str) -> str:
     url = clean_text(url)
 
     if url and not (url.startswith('http://') or url.startswith('https://')):
-        raise DataValidationError("URL必须以 http:// 或 https:// 开头", field="URL")
+        raise DataValidationError("URL必须以 http:// 或 https:// 开头", field=FIELD_URL)
 
     return url
 
@@ -319,11 +390,11 @@ def clean_text(text: str) -> str:
     text = html.unescape(text)
 
     # 移除控制字符（保留换行和制表符）
-    text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]', '', text)
+    text = text.translate(_CONTROL_TRANS) if text.isascii() else _RE_CONTROL.sub('', text)
 
     # 规范化空白字符
-    text = re.sub(r'[ \t]+', ' ', text)  # 多个空格/制表符 -> 单个空格
-    text = re.sub(r'\n{3,}', '\n\n', text)  # 多个换行 -> 最多两个
+    text = _RE_SPACES.sub(' ', text)  # 多个空格/制表符 -> 单个空格
+    text = _RE_NEWLINES.sub('\n\n', text)  # 多个换行 -> 最多两个
 
     # 去除首尾空白
     text = text.strip()
@@ -344,12 +415,12 @@ def sanitize_html(text: str) -> str:
     if not text:
         return ""
 
-    # 移除脚本和样式
-    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.IGNORECASE | re.DOTALL)
-    text = re.sub(r'<style[^>]*>.*?</style>', '', text, flags=re.IGNORECASE | re.DOTALL)
+    # 先移除脚本和样式块：若与普通标签合并为一个正则，文本中游离的 '<'
+    # 会让普通标签分支吞掉 <script> 开始标签，导致脚本内容残留
+    text = _RE_SCRIPT_STYLE.sub('', text)
 
     # 移除所有HTML标签
-    text = re.sub(r'<[^>]+>', '', text)
+    text = _RE_TAG.sub('', text)
 
     # 解码HTML实体
     text = html.unescape(text)
@@ -371,7 +442,7 @@ def remove_extra_whitespaces(text: str) -> str:
         return ""
 
     # 移除所有空白字符
-    text = re.sub(r'\s+', '', text)
+    text = text.translate(_ASCII_WS_TRANS) if text.isascii() else _RE_WS.sub('', text)
 
     return text
 
@@ -389,45 +460,146 @@ def normalize_quotes(text: str) -> str:
     if not text:
         return ""
 
-    # 中文引号互换
-    text = text('"', '"')
-    text = text('"', '"')
-    text = text(''', "'")
-    text = text(''', "'")
-
-    return text
+    # 中文弯引号 -> 英文直引号（单次遍历）
+    return text.translate(_QUOTE_TRANS)
 
 
 # ==================== 批量验证 ====================
 
-def validate_batch(items: List[Any], validator_func, field_name: str = "") -> List[Any]:
+BATCH_ERRORS_MAX = 100  # 批量验证最多收集的错误条数
+
+
+def validate_batch_iter(
+    items: Iterable[Any],
+    validator_func,
+    field_name: str = "",
+    fail_fast: bool = False,
+    collect_errors_max: int = BATCH_ERRORS_MAX
+) -> Iterator[Any]:
     """
-    批量验证列表中的项目
+    逐个验证项目，验证通过的结果随即产出（适合流式消费）
 
     Args:
-        items: 要验证的项目列表
+        items: 要验证的项目（任意可迭代对象）
         validator_func: 验证函数
         field_name: 字段名称
+        fail_fast: 遇到第一个错误即停止
+        collect_errors_max: 最多收集的错误条数，达到后停止验证
 
-    Returns:
-        验证后的项目列表
+    Yields:
+        验证后的项目
 
     Raises:
-        DataValidationError: 如果任一项目验证失败
+        DataValidationError: 迭代结束时如有项目验证失败
     """
-    validated_items = []
     errors = []
 
     for i, item in enumerate(items):
         try:
             validated_item = validator_func(item)
-            validated_items.append(validated_item)
         except DataValidationError as e:
             errors.append(f"项目 {i + 1}: {e.message}")
+            if fail_fast:
+                break
+            if len(errors) >= collect_errors_max:
+                errors.append("...")
+                break
+        else:
+            yield validated_item
+
+    if errors:
+        raise DataValidationError(
+            "批量验证失败:\n" + "\n".join(errors),
+            field=field_name
+        )
+
+
+def validate_batch(
+    items: Iterable[Any],
+    validator_func,
+    field_name: str = "",
+    fail_fast: bool = False,
+    collect_errors_max: int = BATCH_ERRORS_MAX
+) -> List[Any]:
+    """
+    批量验证列表中的项目
+
+    Args:
+        items: 要验证的项目列表
+        validator_func: 验证函数
+        field_name: 字段名称
+        fail_fast: 遇到第一个错误即停止
+        collect_errors_max: 最多收集的错误条数，达到后停止验证
+
+    Returns:
+        验证后的项目列表
+
+    Raises:
+        DataValidationError: 如果任一项目验证失败
+    """
+    return list(validate_batch_iter(items, validator_func, field_name, fail_fast, collect_errors_max))
+
+
+def _validate_one(validator_func, item: Any) -> Tuple[bool, Any]:
+    """在工作线程/进程中验证单个项目，返回 (是否通过, 结果或错误消息)"""
+    try:
+        return True, validator_func(item)
+    except DataValidationError as e:
+        return False, e.message
+
+
+def validate_batch_parallel(
+    items: Iterable[Any],
+    validator_func,
+    field_name: str = "",
+    workers: Optional[int] = None,
+    use_processes: bool = False
+) -> List[Any]:
+    """
+    并行批量验证（适合单项验证耗时较长的场景）
+
+    线程池只在验证函数释放 GIL（如 I/O）时才能真正并行；纯 Python 的
+    CPU 密集型验证应使用进程池，此时 validator_func 和项目必须可以 pickle。
+
+    Args:
+        items: 要验证的项目
+        validator_func: 验证函数
+        field_name: 字段名称
+        workers: 工作线程/进程数，默认为 CPU 核数
+        use_processes: 是否使用进程池
+
+    Returns:
+        验证后的项目列表（与输入顺序一致）
+
+    Raises:
+        DataValidationError: 如果任一项目验证失败
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    chunksize = max(1, len(items) // (workers * 4))  # 仅进程池使用
+
+    with executor_cls(max_workers=workers) as executor:
+        results = list(executor.map(
+            functools.partial(_validate_one, validator_func),
+            items,
+            chunksize=chunksize
+        ))
+
+    validated_items = []
+    errors = []
+    for i, (ok, value) in enumerate(results):
+        if ok:
+            validated_items.append(value)
+        else:
+            errors.append(f"项目 {i + 1}: {value}")
 
     if errors:
         raise DataValidationError(
-            f"批量验证失败:\n" + "\n".join(errors),
+            "批量验证失败:\n" + "\n".join(errors),
             field=field_name
         )
 
@@ -448,26 +620,23 @@ class ValidationBuilder:
 
     def required(self) -> 'ValidationBuilder':
         """验证必填"""
-        try:
-            validate_required(self.value, self.field_name)
-        except DataValidationError as e:
-            self.errors.append(e.message)
+        msg = _required_msg(self.value, self.field_name)
+        if msg:
+            self.errors.append(msg)
         return self
 
     def length(self, min_length: int = 0, max_length: Optional[int] = None) -> 'ValidationBuilder':
         """验证长度"""
-        try:
-            validate_length(self.value, min_length, max_length, self.field_name)
-        except DataValidationError as e:
-            self.errors.append(e.message)
+        msg = _length_msg(self.value, min_length, max_length, self.field_name)
+        if msg:
+            self.errors.append(msg)
         return self
 
     def pattern(self, pattern: str) -> 'ValidationBuilder':
         """验证正则"""
-        try:
-            validate_pattern(self.value, pattern, self.field_name)
-        except DataValidationError as e:
-            self.errors.append(e.message)
+        msg = _pattern_msg(self.value, pattern, self.field_name)
+        if msg:
+            self.errors.append(msg)
         return self
 
     def custom(self, validator_func, *args, **kwargs) -> 'ValidationBuilder':